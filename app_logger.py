@@ -1,4 +1,8 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 import sys
 
 logger = logging.getLogger("lendfoundry")
@@ -9,7 +13,15 @@ if not logger.handlers:
         "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
     )
     handler.setFormatter(formatter)
-    logger.addHandler(handler)
 
-logger.setLevel(logging.DEBUG)
-logger.propagate = True
\ No newline at end of file
+    # Request threads only enqueue records; a background listener thread does
+    # the formatting and the (blocking) stdout write
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+# LOG_LEVEL=INFO in production skips formatting of debug messages entirely
+logger.setLevel(os.getenv("LOG_LEVEL", "DEBUG").upper())
+logger.propagate = True
@@ -1,37 +1,112 @@
 import os
+import re
+import json
 import logging
+from typing import List, Optional
 from dotenv import load_dotenv
 from langchain_core.messages import SystemMessage, HumanMessage
-from services import get_sql_generator_llm
+from services import get_sql_generator_llm, build_sql_messages, static_context_prefix
 from app_logger import logger
 
 load_dotenv()
 
+# Markdown code fences (```sql ... ```) wrapped around the generated query
+_FENCE_RE = re.compile(r'^```(?:sql)?\s*|\s*```$', re.IGNORECASE | re.MULTILINE)
+
+# Static system prompt, built once at import and shared by every generator.
+# Kept flush-left so the exact same bytes are sent on every call (provider
+# implicit prompt caching matches on identical prefixes).
+BASE_SYSTEM_PROMPT = """You are an expert SQL query generator for Amazon Redshift.
+Rules:
+1. Use only tables and columns explicitly provided in the schema. Do not infer or assume any additional fields.
+2. If the user requests a column, metric, or dimension not present in the schema, respond exactly with: "Column not available in schema."
+3. Generate only Redshift-compatible SQL syntax.
+4. Never hallucinate table names, column names, or derived fields.
+5. When joining tables, only join using columns that exist in the schema and are logically related.
+6. Use appropriate aggregations (SUM, COUNT, AVG, etc.) when the query requires them.
+7. Apply clear column aliases for readability.
+8. Use WHERE clauses to filter data efficiently.
+9. Apply ORDER BY and LIMIT only when requested or logically necessary.
+
+Output ONLY the raw SQL query without explanatory text, comments, markdown backticks, or formatting instructions unless a schema violation occurs."""
+
+# Questions packed into one batched generation call; larger batches start to
+# lose accuracy, so longer lists are split
+MAX_BATCH_QUESTIONS = 16
+
+# JSON array in a batched response, with or without a ```json fence around it
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.DOTALL)
+
+
 class SQLQueryGenerator:
     def __init__(self, model_name: str = "gemini-2.5-flash"):
         # Use centralized LangChain LLM service
         self.model = get_sql_generator_llm()
 
-        self.base_system_prompt = """You are an expert SQL query generator for Amazon Redshift.
-                                    Rules:
-                                    1. Use only tables and columns explicitly provided in the schema. Do not infer or assume any additional fields.
-                                    2. If the user requests a column, metric, or dimension not present in the schema, respond exactly with: "Column not available in schema."
-                                    3. Generate only Redshift-compatible SQL syntax.
-                                    4. Never hallucinate table names, column names, or derived fields.
-                                    5. When joining tables, only join using columns that exist in the schema and are logically related.
-                                    6. Use appropriate aggregations (SUM, COUNT, AVG, etc.) when the query requires them.
-                                    7. Apply clear column aliases for readability.
-                                    8. Use WHERE clauses to filter data efficiently.
-                                    9. Apply ORDER BY and LIMIT only when requested or logically necessary.
-
-                                    Output ONLY the raw SQL query without explanatory text, comments, markdown backticks, or formatting instructions unless a schema violation occurs."""
+        self.base_system_prompt = BASE_SYSTEM_PROMPT
 
     @staticmethod
     def _cleanup_sql(text: str) -> str:
         """Remove markdown formatting if present."""
         text = (text or "").strip()
-        text = text.replace("``````", "").strip()
-        return text
+        if "```" not in text:
+            return text
+        return _FENCE_RE.sub("", text).strip()
+
+    def _build_messages(
+        self,
+        user_request: str,
+        schema_info: str,
+        join_details: str,
+        database_type: str,
+    ) -> list:
+        """Build the system + user message payload for SQL generation."""
+        return build_sql_messages(self.base_system_prompt, user_request, schema_info, join_details, database_type)
+
+    def _build_batch_messages(
+        self,
+        user_requests: List[str],
+        schema_infos: List[str],
+        join_details: str,
+        database_type: str,
+    ) -> list:
+        """Build one payload asking for the SQL of several numbered questions.
+
+        The system prompt and static prefix are the same as for single calls,
+        so the batch shares their cached prefix; each question is followed by
+        its own schema information.
+        """
+        sections = "".join(
+            f"Question {i}:\n{request.strip()}\n\nSchema Information for question {i}:\n{schema}\n\n"
+            for i, (request, schema) in enumerate(zip(user_requests, schema_infos), 1)
+        )
+        user_context = "".join((
+            static_context_prefix(database_type, str(join_details)),
+            sections,
+            f"Generate SQL for each of the {len(user_requests)} numbered questions above, "
+            "using only the schema information given for that question. "
+            "Return ONLY a JSON array of strings, where element i is the raw SQL query "
+            "(or the schema violation message) for question i+1, in order.",
+        ))
+
+        return [
+            SystemMessage(content=self.base_system_prompt),
+            HumanMessage(content=user_context),
+        ]
+
+    def _parse_batch(self, text: str, count: int) -> Optional[List[str]]:
+        """SQL per question from a batched response, or None if it doesn't line up."""
+        match = _JSON_ARRAY_RE.search(text or "")
+        if match:
+            try:
+                queries = json.loads(match.group(0))
+            except ValueError:
+                queries = None
+            if isinstance(queries, list) and len(queries) == count and all(isinstance(q, str) for q in queries):
+                return [self._cleanup_sql(q) for q in queries]
+
+        logger.warning(f"Batched SQL generation did not return {count} queries, generating individually")
+        return None
 
     def generate_sql_query(
         self,
@@ -42,23 +117,7 @@ class SQLQueryGenerator:
     ) -> str | None:
         """Generate SQL query based on user request and provided schema information."""
         try:
-            user_context = f"""Database Type: {database_type}
-
-                                Schema Information:
-                                {schema_info}
-
-                                Join Details:
-                                {join_details}
-
-                                User Question:
-                                {user_request}
-
-                                Generate the appropriate SQL query:"""
-
-            messages = [
-                SystemMessage(content=self.base_system_prompt),
-                HumanMessage(content=user_context),
-            ]
+            messages = self._build_messages(user_request, schema_info, join_details, database_type)
 
             logger.info(f"Invoking SQL LLM (model: {getattr(self.model, 'model', 'unknown')})...")
             ai_msg = self.model.invoke(messages)
@@ -69,3 +128,39 @@ class SQLQueryGenerator:
         except Exception as e:
             logger.error(f"Error generating SQL: {e}", exc_info=True)
             return None
+
+    def generate_sql_queries_batch(
+        self,
+        user_requests: List[str],
+        schema_infos: List[str],
+        join_details: str = "",
+        database_type: str = "Redshift",
+    ) -> List[str | None]:
+        """
+        Generate SQL for several questions with one LLM call per MAX_BATCH_QUESTIONS.
+
+        schema_infos[i] is the schema information for user_requests[i]; the
+        static system prompt and join details are paid once per batch instead
+        of once per question. A batch whose response can't be matched back to
+        its questions falls back to generate_sql_query for each of them.
+        """
+        results: List[str | None] = []
+        for start in range(0, len(user_requests), MAX_BATCH_QUESTIONS):
+            batch = user_requests[start:start + MAX_BATCH_QUESTIONS]
+            schemas = schema_infos[start:start + MAX_BATCH_QUESTIONS]
+            queries = None
+            if len(batch) > 1:
+                try:
+                    messages = self._build_batch_messages(batch, schemas, join_details, database_type)
+                    logger.info(f"Invoking SQL LLM for {len(batch)} questions (model: {getattr(self.model, 'model', 'unknown')})...")
+                    queries = self._parse_batch(self.model.invoke(messages).content, len(batch))
+                except Exception as e:
+                    logger.error(f"Error generating batched SQL: {e}", exc_info=True)
+
+            if queries is None:
+                queries = [
+                    self.generate_sql_query(request, schema, join_details, database_type)
+                    for request, schema in zip(batch, schemas)
+                ]
+            results.extend(queries)
+        return results
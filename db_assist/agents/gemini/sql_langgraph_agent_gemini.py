@@ -1,14 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict, Annotated, List, Dict, Any
 from langgraph.graph import StateGraph, END
 from langgraph.graph.message import add_messages
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
+from langchain_core.runnables import RunnableConfig
 from .llm_model_gemini import SQLQueryGenerator
+from ...tools.extract_query import extract_sql_query
+from ...db.safe_query_analyzer import _safe_sql
 from langchain_core.prompts import ChatPromptTemplate
 import os
 from app_logger import logger
 from services import get_langchain_llm
 
+# Concurrent vector-store searches in process_queries
+SCHEMA_SEARCH_WORKERS = 8
+
 
 class SQLAgentState(TypedDict):
     """State structure for the SQL agent workflow"""
@@ -16,6 +23,7 @@ class SQLAgentState(TypedDict):
     messages: Annotated[List[BaseMessage], add_messages]
     retrieved_schema_chunks: List[Dict[str, Any]]
     raw_sql_query: str
+    sql_from_cache: bool
     cleaned_sql_query: str
     validation_result: Dict[str, Any]
     execution_result: str
@@ -52,7 +60,14 @@ class SQLLangGraphAgentGemini:
         workflow.add_node("natural_language_generation", self._natural_language_generation_node)
         workflow.add_node("error_handler", self._error_handler_node)
         
-        workflow.set_entry_point("rewrite_question")
+        # A question answered from the SQL cache starts at validation
+        workflow.set_conditional_entry_point(
+            self._route_entry,
+            {
+                "generate": "rewrite_question",
+                "cached": "query_validation"
+            }
+        )
         
         workflow.add_conditional_edges(
             "rewrite_question",
@@ -149,22 +164,43 @@ class SQLLangGraphAgentGemini:
                 "current_step": "question_rewriting_failed"
             }
 
+    def _search_schema(self, full_query: str) -> List[Dict[str, Any]]:
+        """Top schema chunks for a question, with scores and metadata"""
+        logger.info(f"Schema search for: '{full_query}'")
+
+        schema_results = self.vector_store.similarity_search_with_score(full_query, k=5)
+        
+        retrieved = []
+        for doc, score in schema_results:
+            retrieved.append({
+                "content": doc.page_content,
+                "score": float(score),
+                "metadata": getattr(doc, "metadata", {}) or {}
+            })
+        logger.info(f"Schema search retrieved {len(retrieved)} chunks (scores: {[f'{r['score']:.4f}' for r in retrieved]})") 
+        return retrieved
+
+    def _schema_info_for_llm(self, chunks: List[Dict[str, Any]]) -> str:
+        """Schema context sent to the SQL generator: retrieved chunks plus the database structure"""
+        retrieved_context = "\n".join(c["content"] for c in chunks if c.get("content")).strip()
+        
+        logger.info(f"SQL Generation - Schema chunks: {len(chunks)}, Context length: {len(retrieved_context)} chars")
+
+        db_structure_text = str(self.db_structure or "")
+
+        return f"""
+[RETRIEVED_SCHEMA_CHUNKS]
+{retrieved_context}
+
+[DATABASE_STRUCTURE_NOTE]
+The database is organized into schemas and tables as follows:
+{db_structure_text}
+""".strip()
+
     def _schema_search_node(self, state: SQLAgentState) -> Dict[str, Any]:
         """Search for relevant schema information"""
         try:
-            full_query = state["user_question"]
-            logger.info(f"Schema search for: '{full_query}'")
-
-            schema_results = self.vector_store.similarity_search_with_score(full_query, k=5)
-            
-            retrieved = []
-            for doc, score in schema_results:
-                retrieved.append({
-                    "content": doc.page_content,
-                    "score": float(score),
-                    "metadata": getattr(doc, "metadata", {}) or {}
-                })
-            logger.info(f"Schema search retrieved {len(retrieved)} chunks (scores: {[f'{r['score']:.4f}' for r in retrieved]})") 
+            retrieved = self._search_schema(state["user_question"])
             
             return {
                 "retrieved_schema_chunks": retrieved,
@@ -196,22 +232,7 @@ class SQLLangGraphAgentGemini:
                 if chat_history_text else state["user_question"]
             )
 
-            retrieved_context = "\n".join(
-                c["content"] for c in state.get("retrieved_schema_chunks", []) if c.get("content")
-            ).strip()
-            
-            logger.info(f"SQL Generation - Schema chunks: {len(state.get('retrieved_schema_chunks', []))}, Context length: {len(retrieved_context)} chars")
-
-            db_structure_text = str(self.db_structure or "")
-
-            schema_info_for_llm = f"""
-[RETRIEVED_SCHEMA_CHUNKS]
-{retrieved_context}
-
-[DATABASE_STRUCTURE_NOTE]
-The database is organized into schemas and tables as follows:
-{db_structure_text}
-""".strip()
+            schema_info_for_llm = self._schema_info_for_llm(state.get("retrieved_schema_chunks", []))
             
             raw_query = self.sql_generator.generate_sql_query(
                 user_request=full_user_request,
@@ -244,9 +265,6 @@ The database is organized into schemas and tables as follows:
                     "current_step": "query_validation_failed"
                 }
 
-            from ...tools.extract_query import extract_sql_query
-            from ...db.safe_query_analyzer import _safe_sql
-            
             cleaned_query = extract_sql_query(state["raw_sql_query"], strip_comments=True)
             
             safety_result = _safe_sql(cleaned_query)
@@ -278,12 +296,13 @@ The database is organized into schemas and tables as follows:
                 "current_step": "query_validation_failed"
             }
     
-    def _query_execution_node(self, state: SQLAgentState) -> Dict[str, Any]:
+    def _query_execution_node(self, state: SQLAgentState, config: RunnableConfig) -> Dict[str, Any]:
         """Execute the validated SQL query and log it to database"""
+        # Taken from this run's config: the agent instance is shared by concurrent requests
+        thread_id = config.get("configurable", {}).get("thread_id", "default")
         try:
             # Log the query to database BEFORE execution
             if self.query_runner and state.get("cleaned_sql_query"):
-                thread_id = getattr(self, '_current_thread_id', 'default')
                 self.query_runner.log_query(
                     user_question=state["user_question"],
                     generated_sql=state["cleaned_sql_query"],
@@ -313,7 +332,6 @@ The database is organized into schemas and tables as follows:
         except Exception as e:
             # Log the failure
             if self.query_runner and state.get("cleaned_sql_query"):
-                thread_id = getattr(self, '_current_thread_id', 'default')
                 self.query_runner.log_query(
                     user_question=state["user_question"],
                     generated_sql=state["cleaned_sql_query"],
@@ -386,6 +404,12 @@ The database is organized into schemas and tables as follows:
             "is_complete": True
         }
     
+    def _route_entry(self, state: SQLAgentState) -> str:
+        """Skip generation when the run starts with a cached SQL query"""
+        if state.get("raw_sql_query"):
+            return "cached"
+        return "generate"
+
     def _should_continue_after_rewrite(self, state: SQLAgentState) -> str:
         """Determine next step after question rewriting"""
         if state.get("error_message"):
@@ -419,28 +443,31 @@ The database is organized into schemas and tables as follows:
     def _should_retry_after_execution(self, state: SQLAgentState) -> str:
         """Determine whether to retry SQL generation after a failed execution."""
         if state.get("error_message"):
+            # Cached SQL has no retrieved schema to regenerate from
+            if state.get("sql_from_cache"):
+                return "error"
             if state.get("retry_count", 0) < 3:
                 return "retry"
             else:
                 return "error"
         return "continue"
     
-    def process_query(self, user_question: str, thread_id: str = "default") -> Dict[str, Any]:
-        """Process a user query through the complete workflow
-        
-        Args:
-            user_question: The user's question
-            thread_id: Unique identifier for the conversation thread (e.g., user_id or session_id)
-        """
-        
-        # Store thread_id for logging purposes
-        self._current_thread_id = thread_id
-        
-        initial_state = SQLAgentState(
+    def has_history(self, thread_id: str) -> bool:
+        """Whether the thread has earlier turns (its questions may be follow-ups)"""
+        return self.checkpointer.get_tuple({"configurable": {"thread_id": thread_id}}) is not None
+
+    def forget_thread(self, thread_id: str) -> None:
+        """Drop every checkpointed turn of the thread"""
+        self.checkpointer.delete_thread(thread_id)
+
+    def _initial_state(self, user_question: str, cached_sql: str = "") -> SQLAgentState:
+        """Build the starting state for a new question (cached_sql skips generation)"""
+        return SQLAgentState(
             user_question=user_question,
             messages=[HumanMessage(content=user_question)],
             retrieved_schema_chunks=[],
-            raw_sql_query="",
+            raw_sql_query=cached_sql,
+            sql_from_cache=bool(cached_sql),
             cleaned_sql_query="",
             validation_result={},
             execution_result="",
@@ -450,11 +477,20 @@ The database is organized into schemas and tables as follows:
             is_complete=False,
             retry_count=0
         )
+
+    def process_query(self, user_question: str, thread_id: str = "default", cached_sql: str = "") -> Dict[str, Any]:
+        """Process a user query through the complete workflow
+        
+        Args:
+            user_question: The user's question
+            thread_id: Unique identifier for the conversation thread (e.g., user_id or session_id)
+            cached_sql: Previously generated SQL to validate and run instead of generating one
+        """
         
         config = {"configurable": {"thread_id": thread_id}}
         
         try:
-            final_state = self.workflow.invoke(initial_state, config)
+            final_state = self.workflow.invoke(self._initial_state(user_question, cached_sql), config)
             response = self._format_response(final_state)
             return response
             
@@ -465,6 +501,65 @@ The database is organized into schemas and tables as follows:
                 "user_question": user_question
             }
 
+    async def aprocess_query(self, user_question: str, thread_id: str = "default", cached_sql: str = "") -> Dict[str, Any]:
+        """Async variant of process_query for use inside the event loop
+        
+        LangGraph runs the (synchronous) nodes in its executor, so concurrent
+        requests no longer serialize behind one blocking workflow run.
+        """
+        
+        config = {"configurable": {"thread_id": thread_id}}
+        
+        try:
+            final_state = await self.workflow.ainvoke(self._initial_state(user_question, cached_sql), config)
+            response = self._format_response(final_state)
+            return response
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Workflow execution failed: {str(e)}",
+                "user_question": user_question
+            }
+
+    def process_queries(self, user_questions: List[str]) -> List[Dict[str, Any]]:
+        """Generate and validate SQL for many independent questions (bulk/evaluation runs)
+        
+        Schema searches run concurrently, then the questions are sent to the SQL
+        generator in batches of up to MAX_BATCH_QUESTIONS, each question with its
+        own retrieved chunks, so the static prompt is paid once per batch.
+        Questions carry no chat history and queries are not executed; each
+        result has the same shape as process_query's.
+        """
+        if not user_questions:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(SCHEMA_SEARCH_WORKERS, len(user_questions))) as executor:
+            searches = [executor.submit(self._search_schema, question) for question in user_questions]
+
+        states = []
+        for question, search in zip(user_questions, searches):
+            state = self._initial_state(question)
+            try:
+                state["retrieved_schema_chunks"] = search.result()
+            except Exception as e:
+                logger.error(f"Schema search FAILED: {e}", exc_info=True)
+                state["error_message"] = f"Schema search failed: {str(e)}"
+            states.append(state)
+
+        pending = [state for state in states if not state["error_message"]]
+        raw_queries = self.sql_generator.generate_sql_queries_batch(
+            [state["user_question"] for state in pending],
+            [self._schema_info_for_llm(state["retrieved_schema_chunks"]) for state in pending],
+            join_details=str(self.join_details or ""),
+            database_type="Redshift",
+        )
+        for state, raw_query in zip(pending, raw_queries):
+            state["raw_sql_query"] = raw_query or ""
+            state.update(self._query_validation_node(state))
+            state["is_complete"] = not state["error_message"]
+
+        return [self._format_response(state) for state in states]
     
     def _format_response(self, state: SQLAgentState) -> Dict[str, Any]:
         """Format the final response"""
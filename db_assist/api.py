@@ -1,9 +1,9 @@
 import sys
 import os
 from fastapi import APIRouter
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from fastapi.responses import JSONResponse
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import uuid
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -32,14 +32,20 @@ class ChatRequest(BaseModel):
         default=None,
         description="Thread ID for conversation context. If not provided, a new one will be generated."
     )
+    no_cache: bool = Field(
+        default=False,
+        description="Bypass the semantic SQL cache and generate a fresh query (results are always read live)."
+    )
     
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "prompt": "Show me total loan amount by state",
-                "thread_id": "user_123_session_456"
+                "thread_id": "user_123_session_456",
+                "no_cache": False
             }
         }
+    )
 
 
 class ChatResponse(BaseModel):
@@ -48,14 +54,64 @@ class ChatResponse(BaseModel):
     thread_id: str = Field(..., description="Thread ID for follow-up queries")
     success: bool = Field(..., description="Whether the query executed successfully")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "response": "The total loan amount is $1,500,000 across 150 active loans.",
                 "thread_id": "user_123_session_456",
                 "success": True
             }
         }
+    )
+
+
+class SQLBatchRequest(BaseModel):
+    """Request body for DB Assist batch SQL generation"""
+    prompts: List[str] = Field(
+        ...,
+        description="Independent natural language questions; no chat history is applied",
+        min_length=1,
+        max_length=100
+    )
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "prompts": [
+                    "How many active loans are there?",
+                    "Show me total loan amount by state"
+                ]
+            }
+        }
+    )
+
+
+class SQLBatchItem(BaseModel):
+    """Generated SQL for one question of a batch"""
+    prompt: str = Field(..., description="The question this SQL was generated for")
+    sql: Optional[str] = Field(default=None, description="The validated SQL query, if generation succeeded")
+    success: bool = Field(..., description="Whether a valid query was generated")
+    error: Optional[str] = Field(default=None, description="Why generation or validation failed")
+
+
+class SQLBatchResponse(BaseModel):
+    """Response from DB Assist batch SQL generation"""
+    results: List[SQLBatchItem] = Field(..., description="One entry per prompt, in request order")
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "results": [
+                    {
+                        "prompt": "How many active loans are there?",
+                        "sql": "SELECT COUNT(*) AS active_loans FROM loans WHERE status = 'Active'",
+                        "success": True,
+                        "error": None
+                    }
+                ]
+            }
+        }
+    )
 
 
 class HealthStatus(BaseModel):
@@ -70,8 +126,8 @@ class HealthResponse(BaseModel):
     status: str = Field(..., description="Overall health status: 'healthy' or 'degraded'")
     components: HealthStatus = Field(..., description="Status of individual components")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "status": "healthy",
                 "components": {
@@ -81,8 +137,9 @@ class HealthResponse(BaseModel):
                 }
             }
         }
+    )
 
-async def process_db_query(prompt: str, thread_id: str = None) -> dict:
+async def process_db_query(prompt: str, thread_id: str = None, use_cache: bool = True) -> dict:
     """
     Core DB Assist logic - can be called directly from unified API
     """
@@ -90,7 +147,7 @@ async def process_db_query(prompt: str, thread_id: str = None) -> dict:
     thread_id = thread_id or str(uuid.uuid4())
     
     # Process the query
-    result = await chatbot.get_response(prompt, thread_id=thread_id)
+    result = await chatbot.get_response(prompt, thread_id=thread_id, use_cache=use_cache)
     
     if result and result.get('success'):
         response_data = result.get('natural_language_response', 'No execution result found.')
@@ -131,7 +188,7 @@ async def chat(request: ChatRequest) -> ChatResponse:
     """
     Endpoint to handle chat requests and return a standard JSON response.
     """
-    result = await process_db_query(request.prompt, request.thread_id)
+    result = await process_db_query(request.prompt, request.thread_id, use_cache=not request.no_cache)
     return ChatResponse(
         response=result["response"],
         thread_id=result["thread_id"],
@@ -139,6 +196,37 @@ async def chat(request: ChatRequest) -> ChatResponse:
     )
 
 
+@router.post(
+    "/sql/batch",
+    response_model=SQLBatchResponse,
+    summary="Batch SQL Generation",
+    description="""
+    Generate and validate SQL for several independent questions without executing it.
+    
+    Each question gets its own schema search; the questions are then sent to the
+    SQL generator together, so this is much cheaper than one `/chat` call per
+    question for bulk or evaluation runs.
+    """
+)
+async def sql_batch(request: SQLBatchRequest):
+    """
+    Endpoint to generate SQL for a list of questions in one call.
+    """
+    result = await chatbot.get_sql_batch(request.prompts)
+    if "error" in result:
+        return JSONResponse(status_code=503, content={"detail": result["error"]})
+
+    return SQLBatchResponse(results=[
+        SQLBatchItem(
+            prompt=prompt,
+            sql=item.get("cleaned_sql_query") if item.get("success") else None,
+            success=item.get("success", False),
+            error=item.get("error")
+        )
+        for prompt, item in zip(request.prompts, result["results"])
+    ])
+
+
 @router.get(
     "/health",
     response_model=HealthResponse,
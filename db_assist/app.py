@@ -2,6 +2,9 @@ import streamlit as st
 import requests
 import json
 
+API_URL = "http://127.0.0.1:8000/api/chat"
+REQUEST_TIMEOUT = (5, 120)  # (connect, read) seconds
+
 # --- App Configuration ---
 st.set_page_config(page_title="Lendfoundry Chatbot", page_icon="🤖")
 
@@ -9,6 +12,14 @@ st.set_page_config(page_title="Lendfoundry Chatbot", page_icon="🤖")
 st.title("Lendfoundry Chatbot")
 st.write("Ask me questions about your data!")
 
+# --- HTTP Session ---
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """One keep-alive session shared across reruns, so each message reuses the backend connection."""
+    session = requests.Session()
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
 # --- Session State Initialization ---
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -29,7 +40,7 @@ if prompt := st.chat_input("What is up?"):
     # Get bot response from the API
     with st.spinner("Thinking..."):
         try:
-            response = requests.post("http://127.0.0.1:8000/api/chat", json={"prompt": prompt})
+            response = get_http_session().post(API_URL, json={"prompt": prompt}, timeout=REQUEST_TIMEOUT)
             response.raise_for_status()  # Raise an exception for bad status codes
             response_data = response.json()
             bot_response = response_data.get("response", "No response from the bot.")
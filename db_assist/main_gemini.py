@@ -1,10 +1,13 @@
 import os
 import sys
+import asyncio
+import time
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 from app_logger import logger
+from services import SemanticCache, question_literals
 
 # Adjust imports to be relative to the 'src' directory
 from db_assist.agents.gemini.sql_langgraph_agent_gemini import SQLLangGraphAgentGemini
@@ -17,6 +20,10 @@ from db.table_descriptions_semantic import documents, join_details, schema_info
 # Load environment variables from .env file
 load_dotenv()
 
+# Generated SQL doesn't depend on who asked, so every thread shares one cache scope
+SQL_CACHE_SCOPE = "sql"
+SQL_CACHE_THRESHOLD = float(os.getenv("DB_SQL_CACHE_THRESHOLD", "0.97"))
+
 
 class Chatbot:
     def __init__(self):
@@ -25,6 +32,7 @@ class Chatbot:
         self.vector_store = None
         self.query_runner = None
         self.gemini_agent = None
+        self.response_cache = None
         self._init_agent_components()
     
     def _init_agent_components(self):
@@ -42,6 +50,15 @@ class Chatbot:
             logger.error(f"Error loading existing vector store: {e}")
             self.vector_store = None
         
+        # Semantic cache of generated SQL (same embedder as schema search)
+        if self.vector_store:
+            self.response_cache = SemanticCache(
+                embed_fn=self.vector_store.embeddings.embed_query,
+                threshold=SQL_CACHE_THRESHOLD
+            )
+        else:
+            self.response_cache = None
+        
         # Initialize Query Runner
         try:
             self.query_runner = RedshiftSQLTool()
@@ -89,13 +106,14 @@ class Chatbot:
             logger.error(f"Error loading existing vector store: {e}")
             return None
 
-    async def get_response(self, user_question: str, thread_id: str = "default"):
+    async def get_response(self, user_question: str, thread_id: str = "default", use_cache: bool = True):
         """
         Processes the user's question as a database query.
         
         Args:
             user_question: The user's question
             thread_id: Unique identifier for the conversation thread (e.g., user_id or session_id)
+            use_cache: Reuse the SQL generated for a near-duplicate question (the query still runs live)
         """
         logger.debug(f"Processing query for thread: {thread_id}")
         
@@ -109,14 +127,41 @@ class Chatbot:
         # Process the user question with thread_id
         logger.info(f"Processing user question: '{user_question}'")
 
+        # Only standalone questions use the SQL cache: a follow-up is rewritten
+        # from the thread's history, so its text alone doesn't determine the SQL
+        cache_vector = None
+        cached_sql = ""
+        if use_cache and self.response_cache and not self.gemini_agent.has_history(thread_id):
+            try:
+                cache_vector = await asyncio.to_thread(self.response_cache.embed, user_question)
+                cached = await asyncio.to_thread(self.response_cache.lookup, SQL_CACHE_SCOPE, cache_vector)
+                if cached is not None and cached["literals"] == question_literals(user_question):
+                    logger.info(f"Reusing cached SQL for thread: {thread_id}")
+                    cached_sql = cached["sql"]
+            except Exception as e:
+                logger.warning(f"Semantic cache lookup failed, continuing without cache: {e}")
+                cache_vector = None
+
         try:
             # The agent now handles chat history internally via LangGraph's checkpointer
-            result = self.gemini_agent.process_query(user_question, thread_id=thread_id)
+            result = await self.gemini_agent.aprocess_query(user_question, thread_id=thread_id, cached_sql=cached_sql)
+            if cached_sql and not result.get('success'):
+                logger.warning(f"Cached SQL failed ({result.get('error')}), generating a new query")
+                cached_sql = ""
+                # The thread had no history before this question: drop the failed
+                # turn so the retry isn't treated as a follow-up and rewritten
+                self.gemini_agent.forget_thread(thread_id)
+                result = await self.gemini_agent.aprocess_query(user_question, thread_id=thread_id)
 
             # Log the final result
             logger.debug(f"Agent result - Success: {result.get('success')}")
             if result.get('success'):
                 logger.debug(f"Cleaned SQL Query: {result.get('cleaned_sql_query')}")
+                if cache_vector is not None and not cached_sql and result.get('cleaned_sql_query'):
+                    self.response_cache.add(SQL_CACHE_SCOPE, cache_vector, {
+                        "sql": result["cleaned_sql_query"],
+                        "literals": question_literals(user_question),
+                    })
             else:
                 logger.error(f"Agent error: {result.get('error')}")
             return result
@@ -125,6 +170,43 @@ class Chatbot:
             logger.error(f"An error occurred during query processing: {e}")
             return {"error": f"An error occurred during query processing: {e}"}
     
+    async def get_sql_batch(self, user_questions: list):
+        """
+        Generates and validates SQL for several standalone questions without running them.
+        
+        Args:
+            user_questions: Independent questions (no chat history is applied)
+        """
+        if not self.gemini_agent:
+            return {"error": "SQL Agent not initialized. Please check if vector store exists."}
+        
+        if not self.vector_store:
+            return {"error": "No existing vector store found. Please create the vector store first."}
+
+        logger.info(f"Processing batch of {len(user_questions)} questions")
+        try:
+            return {"results": await asyncio.to_thread(self.gemini_agent.process_queries, user_questions)}
+        except Exception as e:
+            logger.error(f"An error occurred during batch query processing: {e}")
+            return {"error": f"An error occurred during batch query processing: {e}"}
+    
+    def warmup(self):
+        """
+        Prime connections before the first user request: embeds a probe string
+        and runs a k=1 schema search, which opens the embeddings API and PGVector
+        connections that would otherwise be paid for by the first caller.
+        """
+        if not self.vector_store:
+            logger.warning("Skipping warmup: no vector store loaded.")
+            return
+        
+        start = time.perf_counter()
+        try:
+            self.vector_store.similarity_search("warmup", k=1)
+            logger.info(f"DB Assist warmup completed in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logger.warning(f"DB Assist warmup failed (continuing): {e}")
+    
     def reinitialize_agent(self):
         """Reinitialize the agent (useful if vector store is updated)"""
         logger.info("Reinitializing agent components...")
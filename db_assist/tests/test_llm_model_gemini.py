@@ -0,0 +1,73 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from db_assist.agents.gemini import llm_model_gemini
+from db_assist.agents.gemini.llm_model_gemini import SQLQueryGenerator
+
+
+@pytest.fixture
+def generator(monkeypatch):
+    monkeypatch.setattr(llm_model_gemini, "get_sql_generator_llm", MagicMock)
+    return SQLQueryGenerator()
+
+
+def reply(content):
+    return MagicMock(content=content)
+
+
+def test_parse_batch_reads_a_fenced_json_array(generator):
+    text = '```json\n["```sql\\nSELECT 1\\n```", "SELECT 2"]\n```'
+    assert generator._parse_batch(text, 2) == ["SELECT 1", "SELECT 2"]
+
+
+@pytest.mark.parametrize("text", [
+    '["SELECT 1"]',
+    '["SELECT 1", 2]',
+    '["SELECT 1", "SELECT 2"',
+    "SELECT 1; SELECT 2",
+    "",
+])
+def test_parse_batch_rejects_responses_that_do_not_line_up(generator, text):
+    assert generator._parse_batch(text, 2) is None
+
+
+def test_batch_prompt_pairs_each_question_with_its_own_schema(generator):
+    messages = generator._build_batch_messages(
+        ["loans by state", "payments this month"],
+        ["loans schema", "payments schema"],
+        join_details="joins",
+        database_type="Redshift",
+    )
+    user = messages[1].content
+    assert user.startswith("Database Type: Redshift\n\nJoin Details:\njoins\n\n")
+    assert user.index("loans by state") < user.index("loans schema") < user.index("payments this month")
+    assert user.index("payments this month") < user.index("payments schema")
+    assert user.count("loans schema") == 1
+
+
+def test_generate_batch_uses_one_call_per_batch(generator, monkeypatch):
+    monkeypatch.setattr(llm_model_gemini, "MAX_BATCH_QUESTIONS", 2)
+    generator.model.invoke.side_effect = [
+        reply(json.dumps(["SELECT 1", "SELECT 2"])),
+        reply(json.dumps(["SELECT 3", "SELECT 4"])),
+    ]
+
+    queries = generator.generate_sql_queries_batch(["q1", "q2", "q3", "q4"], ["schema_1", "schema_2", "schema_3", "schema_4"])
+
+    assert queries == ["SELECT 1", "SELECT 2", "SELECT 3", "SELECT 4"]
+    assert generator.model.invoke.call_count == 2
+    second_batch = generator.model.invoke.call_args.args[0][1].content
+    assert "schema_3" in second_batch and "schema_1" not in second_batch
+
+
+def test_generate_batch_falls_back_to_single_calls_with_each_schema(generator):
+    generator.model.invoke.side_effect = [reply("not json"), reply("SELECT 1"), reply("SELECT 2")]
+
+    queries = generator.generate_sql_queries_batch(["q1", "q2"], ["schema_1", "schema_2"])
+
+    assert queries == ["SELECT 1", "SELECT 2"]
+    single_calls = [call.args[0][1].content for call in generator.model.invoke.call_args_list[1:]]
+    assert "schema_1" in single_calls[0] and "schema_2" not in single_calls[0]
+    assert "schema_2" in single_calls[1] and "schema_1" not in single_calls[1]
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from db_assist.agents.gemini import sql_langgraph_agent_gemini
+from db_assist.agents.gemini.sql_langgraph_agent_gemini import SQLLangGraphAgentGemini
+
+
+class FailingRunner:
+    """Query runner whose queries all fail once every caller is inside run()."""
+
+    def __init__(self, parties):
+        self.barrier = threading.Barrier(parties, timeout=10)
+        self.logged = []
+
+    def log_query(self, user_question, generated_sql, thread_id, execution_status):
+        self.logged.append((user_question, thread_id, execution_status.split(":")[0]))
+
+    def run(self, sql):
+        self.barrier.wait()
+        raise RuntimeError("relation does not exist")
+
+
+@pytest.fixture
+def make_agent(monkeypatch):
+    monkeypatch.setattr(sql_langgraph_agent_gemini, "SQLQueryGenerator", MagicMock())
+    monkeypatch.setattr(sql_langgraph_agent_gemini, "get_langchain_llm", MagicMock)
+    return lambda runner: SQLLangGraphAgentGemini(MagicMock(), "joins", "schema", query_runner=runner)
+
+
+def test_concurrent_runs_log_their_own_thread_id(make_agent):
+    runner = FailingRunner(parties=2)
+    agent = make_agent(runner)
+
+    async def run():
+        return await asyncio.gather(
+            agent.aprocess_query("loans by state", thread_id="thread-a", cached_sql="SELECT 1"),
+            agent.aprocess_query("payments by month", thread_id="thread-b", cached_sql="SELECT 2"),
+        )
+
+    results = asyncio.run(run())
+
+    assert [r["success"] for r in results] == [False, False]
+    assert sorted(runner.logged) == [
+        ("loans by state", "thread-a", "failed"),
+        ("loans by state", "thread-a", "pending"),
+        ("payments by month", "thread-b", "failed"),
+        ("payments by month", "thread-b", "pending"),
+    ]
+
+
+def test_only_cached_sql_skips_the_retry(make_agent):
+    agent = make_agent(None)
+    failed = {"error_message": "Query execution failed", "retry_count": 1, "retrieved_schema_chunks": []}
+
+    assert agent._should_retry_after_execution(failed) == "retry"
+    assert agent._should_retry_after_execution({**failed, "sql_from_cache": True}) == "error"
+
+
+def test_forget_thread_drops_a_failed_cached_turn(make_agent):
+    agent = make_agent(FailingRunner(parties=1))
+    result = asyncio.run(agent.aprocess_query("loans by state", thread_id="thread-a", cached_sql="SELECT 1"))
+
+    assert not result["success"]
+    assert agent.has_history("thread-a")
+    agent.forget_thread("thread-a")
+    assert not agent.has_history("thread-a")
@@ -58,7 +58,8 @@ class SQLGenerationTool(BaseTool):
         try:
             # Parse schema info back to list format
             schema_list = json.loads(schema_info)
-            schema_content = [item["content"] + str(item["score"]) for item in schema_list]
+            # Similarity scores mean nothing to the model; send the chunk text only
+            schema_content = "\n".join(item["content"] for item in schema_list if item.get("content"))
             
             query = self.sql_generator.generate_sql_query(
                 user_request=user_request,
@@ -11,12 +11,14 @@ class MySQLGeneratorTool:
 
     def __init__(self, join_details):
         self.join_details = join_details
+        # Build the generator (and its LLM client) once and reuse it across calls
+        self.generator = SQLQueryGenerator()
 
     def _run(self, tool_input: Dict[str, Any]) -> str:
         user_request = tool_input["user_request"]
         schema_info = tool_input["schema_info"]
         # call your existing pipeline
-        query = SQLQueryGenerator().generate_sql_query(
+        query = self.generator.generate_sql_query(
             user_request=user_request,
             schema_info=schema_info,
             join_details=self.join_details,
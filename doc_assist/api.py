@@ -1,13 +1,61 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from pydantic import BaseModel, Field
-from google.genai.types import Content, Part, Blob  # Required types for PDF handling
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Request, Response
+from pydantic import BaseModel, Field, ConfigDict
+from google.genai.types import Content, Part  # Required types for batch PDF requests
+from typing import List, Optional
 import PyPDF2
+import asyncio
+import bisect
+import hashlib
 import io
+import re
+import os
+from cachetools import TTLCache
 from services import get_gemini_client
+from doc_assist.batch_store import BatchQuestionStore
+
+try:
+    # C-backed parser: page count without a Python-level xref parse
+    import pymupdf
+except ImportError:
+    pymupdf = None
+
+PDF_READ_ERRORS = (PyPDF2.errors.PdfReadError, KeyError, TypeError, ValueError)
+if pymupdf is not None:
+    PDF_READ_ERRORS += (pymupdf.FileDataError,)
 
 
 router = APIRouter(prefix="/doc-assist", tags=["Doc Assist"])
 
+MAX_PDF_BYTES = 5 * 1024 * 1024
+MAX_PDF_PAGES = 20
+# Page-tree nodes walked before a PDF is rejected; an honest tree within the
+# page limit needs a few dozen
+MAX_PAGE_TREE_VISITS = 10_000
+# Raw-scan page count rejected without parsing; the margin absorbs page
+# objects left behind by incremental updates
+SCAN_REJECT_PAGES = 2 * MAX_PDF_PAGES
+# Room for the multipart boundaries and the question field in Content-Length
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_READ_CHUNK = 64 * 1024
+# Largest multipart request body that can carry an allowed PDF
+MAX_UPLOAD_REQUEST_BYTES = MAX_PDF_BYTES + MULTIPART_OVERHEAD_BYTES
+
+# Shared Gemini client: every request reuses its connection pool
+gemini = get_gemini_client()
+
+ANSWER_CACHE_TTL = 3600
+
+# Answers per (document digest, question); repeated questions on the same PDF
+# skip both parsing and the Gemini call. Entries expire so answers are refreshed
+# against the current model within the hour.
+_answer_cache: TTLCache = TTLCache(maxsize=512, ttl=ANSWER_CACHE_TTL)
+
+MAX_BATCH_QUESTIONS = 50
+# Questions per submitted batch job, so results can be paired with them on any
+# worker and after a restart (Gemini keeps batch results for up to 48h)
+BATCH_STORE_PATH = os.getenv("DOC_ASSIST_BATCH_DB_PATH", "data/doc_assist_batches.sqlite3")
+batch_questions = BatchQuestionStore(BATCH_STORE_PATH, ttl_seconds=48 * 3600)
+
 
 # =============================================
 # REQUEST/RESPONSE SCHEMAS
@@ -17,63 +65,247 @@ class DocAssistResponse(BaseModel):
     """Response from document Q&A endpoint"""
     answer: str = Field(..., description="The AI-generated answer based on the uploaded document")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "answer": "According to the document, the interest rate is 5.5% APR with a 30-year term..."
             }
         }
+    )
 
 
 class DocAssistRootResponse(BaseModel):
     """Response for doc-assist root endpoint"""
     message: str = Field(..., description="Welcome message")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {"message": "Welcome to the Doc Assist API"}
         }
+    )
+
+
+class DocAssistBatchResponse(BaseModel):
+    """Status (and, once finished, answers) of a batch document Q&A job"""
+    batch_id: str = Field(..., description="Batch job ID to poll")
+    state: str = Field(..., description="Gemini batch job state, e.g. JOB_STATE_PENDING or JOB_STATE_SUCCEEDED")
+    questions: List[str] = Field(default_factory=list, description="Submitted questions, in order")
+    answers: Optional[List[Optional[str]]] = Field(None, description="Answers in question order once the job has succeeded")
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "batch_id": "abc123",
+                "state": "JOB_STATE_SUCCEEDED",
+                "questions": ["What is the interest rate?", "What is the loan term?"],
+                "answers": ["The interest rate is 5.5% APR.", "The term is 30 years."]
+            }
+        }
+    )
 
 
 class HTTPErrorResponse(BaseModel):
     """Error response schema"""
     detail: str = Field(..., description="Error description")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {"detail": "Invalid file type. Please upload a PDF."}
         }
+    )
 
 
-async def process_pdf_question(question: str, file_content: bytes, filename: str = "document.pdf") -> str:
+async def read_upload_bounded(file: UploadFile, limit: int = MAX_PDF_BYTES) -> bytes:
     """
-    Core Doc Assist logic - can be called directly from unified API
+    Read an upload in chunks, rejecting it with 413 as soon as it exceeds
+    `limit` instead of buffering the whole file first.
+    """
+    if file.size is not None:
+        if file.size > limit:
+            raise HTTPException(status_code=413, detail="File size exceeds the 5MB limit.")
+        # Size already known to be within the limit: one read into one bytes
+        # object, instead of a growing buffer plus a final copy of it
+        return await file.read()
+    
+    chunks = []
+    total = 0
+    while chunk := await file.read(UPLOAD_READ_CHUNK):
+        total += len(chunk)
+        if total > limit:
+            raise HTTPException(status_code=413, detail="File size exceeds the 5MB limit.")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+# Object headers ("12 0 obj") and page dictionaries ("/Type /Page", not the
+# "/Type /Pages" tree nodes)
+_OBJ_HEADER_RE = re.compile(rb"(\d+)\s+\d+\s+obj\b")
+_PAGE_TYPE_RE = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+
+
+def scan_pdf_pages(file_content: bytes) -> int:
     """
-    # Validate PDF
+    Rough page count from a raw byte scan for page objects.
+
+    It can be off either way. Pages inside compressed object streams are
+    invisible to it, and page objects the page tree no longer lists (orphans,
+    or pages an incremental update replaced with new objects) are still
+    counted. Each page dictionary is attributed to the object header before
+    it and objects are counted by number, so a page object rewritten in place
+    by an update is counted once. Both scans are linear in the file size.
+    """
+    headers = [(m.start(), m.group(1)) for m in _OBJ_HEADER_RE.finditer(file_content)]
+    starts = [start for start, _ in headers]
+    pages = set()
+    for m in _PAGE_TYPE_RE.finditer(file_content):
+        i = bisect.bisect_right(starts, m.start()) - 1
+        if i >= 0:
+            pages.add(headers[i][1])
+    return len(pages)
+
+
+# Indirect references ("12 0 R") in a PyMuPDF object string
+_REF_RE = re.compile(r"(\d+)\s+\d+\s+R")
+
+
+def _count_tree_leaves(root, kids_of, limit: int | None = None) -> int:
+    """
+    Leaves of a page tree, counting a page once for every /Kids entry that
+    lists it, as a viewer renders every listing. kids_of(node) returns
+    a node's children, or None for a leaf.
+
+    Only a node's own ancestors are skipped, which breaks cycles without
+    dropping repeated pages. Counting stops once it passes `limit`, and a tree
+    that needs more than MAX_PAGE_TREE_VISITS nodes raises ValueError.
+    """
+    stack = [(root, frozenset())]
+    pages = visits = 0
+    while stack:
+        node, ancestors = stack.pop()
+        visits += 1
+        if visits > MAX_PAGE_TREE_VISITS:
+            raise ValueError("Page tree is too large to walk")
+        kids = kids_of(node)
+        if kids is None:
+            pages += 1
+            if limit is not None and pages > limit:
+                break
+            continue
+        path = ancestors | {node}
+        stack.extend((kid, path) for kid in kids if kid not in path)
+    return pages
+
+
+def _pymupdf_page_tree(doc):
+    """Root xref and kids_of function for the page tree, via PyMuPDF's object API."""
+    def kids_of(xref):
+        kind, kids = doc.xref_get_key(xref, "Kids")
+        if kind == "xref":
+            # /Kids stored as an indirect array
+            kids = doc.xref_object(int(_REF_RE.match(kids).group(1)))
+        elif kind != "array":
+            return None
+        return [int(n) for n in _REF_RE.findall(kids)]
+
+    _, pages_ref = doc.xref_get_key(doc.pdf_catalog(), "Pages")
+    root = _REF_RE.match(pages_ref)
+    if root is None:
+        raise ValueError("PDF catalog has no page tree")
+    return int(root.group(1)), kids_of
+
+
+def _pypdf2_page_tree(reader):
+    """Root object number and kids_of function for the page tree, via PyPDF2."""
+    def kids_of(idnum):
+        kids = reader.get_object(idnum).get("/Kids")
+        if kids is None:
+            return None
+        # /Kids may itself be stored as an indirect array
+        return [kid.idnum for kid in kids.get_object() if isinstance(kid, PyPDF2.generic.IndirectObject)]
+
+    return reader.trailer["/Root"].raw_get("/Pages").idnum, kids_of
+
+
+def count_pdf_pages(file_content: bytes, limit: int | None = None) -> int:
+    """
+    Page count: the larger of the page tree's leaves and the root's declared
+    /Count. The tree is walked via PyMuPDF when installed, otherwise PyPDF2.
+    Neither number alone can be trusted to be low: /Count is just a number in
+    the file, and /Kids can list one page object many times. With `limit`,
+    the walk stops once the count is known to exceed it.
+    """
+    if pymupdf is not None:
+        with pymupdf.open(stream=file_content, filetype="pdf") as doc:
+            root, kids_of = _pymupdf_page_tree(doc)
+            # doc.page_count is the root's /Count
+            return max(_count_tree_leaves(root, kids_of, limit), doc.page_count)
+    
+    # BytesIO over bytes shares the buffer (no copy until written to)
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content), strict=False)
+    root, kids_of = _pypdf2_page_tree(pdf_reader)
+    declared = pdf_reader.get_object(root).get("/Count")
+    declared = 0 if declared is None else int(declared.get_object())
+    return max(_count_tree_leaves(root, kids_of, limit), declared)
+
+
+def answer_etag(file_content: bytes, question: str) -> str:
+    """Strong ETag for the answer to `question` about `file_content`."""
+    h = hashlib.blake2b(file_content, digest_size=16)
+    h.update(question.strip().encode("utf-8"))
+    return f'"{h.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """True if an If-None-Match header lists `etag` (or is "*")."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def validate_pdf_pages(file_content: bytes) -> None:
+    """Raise 400 if the PDF is unreadable or over the page limit."""
+    # Not a PDF at all: no header within the first 1 KB (where readers look)
+    if b"%PDF-" not in file_content[:1024]:
+        raise HTTPException(status_code=400, detail="Could not read the PDF file. It may be corrupted.")
+    
+    # Fast reject only: files far past the limit fail without a parser. The
+    # scan can be off either way, so every other file gets a real page count.
+    if scan_pdf_pages(file_content) > SCAN_REJECT_PAGES:
+        raise HTTPException(status_code=400, detail="PDF exceeds the 20-page limit.")
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        if len(pdf_reader.pages) > 20:
+        if count_pdf_pages(file_content, limit=MAX_PDF_PAGES) > MAX_PDF_PAGES:
             raise HTTPException(status_code=400, detail="PDF exceeds the 20-page limit.")
-    except PyPDF2.errors.PdfReadError:
+    except PDF_READ_ERRORS:
         raise HTTPException(status_code=400, detail="Could not read the PDF file. It may be corrupted.")
+
+
+async def process_pdf_question(question: str, file_content: bytes, filename: str = "document.pdf") -> str:
+    """
+    Core Doc Assist logic - can be called directly from unified API
+    """
+    # Check file size (5 MB limit) before parsing anything
+    if len(file_content) > MAX_PDF_BYTES:
+        raise HTTPException(status_code=413, detail="File size exceeds the 5MB limit.")
     
-    # Check file size (5 MB limit)
-    if len(file_content) > 5 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File size exceeds the 5MB limit.")
+    # blake2b: fast, and collision-safe enough for a cache key
+    cache_key = (hashlib.blake2b(file_content, digest_size=16).digest(), question.strip())
+    cached = _answer_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    # Parsing is CPU-bound: keep it off the event loop
+    await asyncio.to_thread(validate_pdf_pages, file_content)
     
-    # Call Gemini API with proper Content/Part/Blob structure
-    gemini = get_gemini_client()
-    content = Content(
-        parts=[
-            Part(text=question),
-            Part(inline_data=Blob(mime_type="application/pdf", data=file_content))
-        ]
-    )
     try:
-        response = gemini.generate_content([content])
-        return response.text
+        # Async client: the event loop keeps serving other requests meanwhile
+        answer = await gemini.answer_pdf_async(question, file_content)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Gemini API error: {e}")
+    
+    if answer:
+        _answer_cache[cache_key] = answer
+    return answer
 
 # Router endpoint
 @router.post(
@@ -98,10 +330,6 @@ async def process_pdf_question(question: str, file_content: bytes, filename: str
                             "summary": "Too many pages",
                             "value": {"detail": "PDF exceeds the 20-page limit."}
                         },
-                        "file_too_large": {
-                            "summary": "File too large",
-                            "value": {"detail": "File size exceeds the 5MB limit."}
-                        },
                         "corrupted": {
                             "summary": "Corrupted PDF",
                             "value": {"detail": "Could not read the PDF file. It may be corrupted."}
@@ -110,6 +338,18 @@ async def process_pdf_question(question: str, file_content: bytes, filename: str
                 }
             }
         },
+        304: {
+            "description": "Not modified - the If-None-Match ETag matches this file and question"
+        },
+        413: {
+            "description": "File too large (over 5MB)",
+            "model": HTTPErrorResponse,
+            "content": {
+                "application/json": {
+                    "example": {"detail": "File size exceeds the 5MB limit."}
+                }
+            }
+        },
         500: {
             "description": "Internal server error - Gemini API error",
             "model": HTTPErrorResponse
@@ -133,9 +373,15 @@ async def process_pdf_question(question: str, file_content: bytes, filename: str
     Send as `multipart/form-data` with:
     - `question`: Your natural language question
     - `file`: The PDF file to analyze
+    
+    ## Caching
+    Responses carry an `ETag` derived from the file and question. Send it back in
+    `If-None-Match` to get `304 Not Modified` instead of a new answer.
     """
 )
 async def ask_question(
+    request: Request,
+    response: Response,
     question: str = Form(
         ..., 
         description="The question to ask about the uploaded document",
@@ -152,12 +398,110 @@ async def ask_question(
     if not file.content_type == "application/pdf":
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload a PDF.")
     
-    file_content = await file.read()
+    file_content = await read_upload_bounded(file)
+    
+    # Same file and question as the client's copy: skip Gemini and the body
+    etag = answer_etag(file_content, question)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
     answer = await process_pdf_question(question, file_content, file.filename)
     
+    response.headers["ETag"] = etag
     return DocAssistResponse(answer=answer)
 
 
+@router.post(
+    "/ask-batch",
+    response_model=DocAssistBatchResponse,
+    status_code=202,
+    responses={
+        400: {"description": "Invalid file, no questions, or too many questions", "model": HTTPErrorResponse},
+        413: {"description": "File too large (over 5MB)", "model": HTTPErrorResponse},
+        500: {"description": "Gemini API error", "model": HTTPErrorResponse}
+    },
+    summary="Ask Several Questions About a Document (Batch)",
+    description="""
+    Submit one PDF with several questions as a Gemini Batch Mode job.
+    
+    Batch jobs cost half as much per token but are not interactive: results are
+    typically ready within minutes and at most 24 hours. Poll
+    `GET /doc-assist/ask-batch/{batch_id}` until `state` is `JOB_STATE_SUCCEEDED`.
+    
+    Send as `multipart/form-data` with a repeated `questions` field (max 50) and `file`.
+    Same file limits as `/ask`.
+    """
+)
+async def ask_question_batch(
+    questions: List[str] = Form(..., description="Questions to ask about the document (repeat the field)"),
+    file: UploadFile = File(..., description="PDF file to analyze (max 5MB, 20 pages)")
+) -> DocAssistBatchResponse:
+    """
+    Validates the PDF once, uploads it to the Files API so every question
+    references the same copy, and submits one batch job.
+    """
+    if not file.content_type == "application/pdf":
+        raise HTTPException(status_code=400, detail="Invalid file type. Please upload a PDF.")
+    
+    questions = [q.strip() for q in questions if q.strip()]
+    if not questions:
+        raise HTTPException(status_code=400, detail="At least one question is required.")
+    if len(questions) > MAX_BATCH_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUESTIONS} questions per batch.")
+    
+    file_content = await read_upload_bounded(file)
+    await asyncio.to_thread(validate_pdf_pages, file_content)
+    
+    try:
+        pdf_part = await gemini.pdf_file_part_async(file_content)
+        job = await gemini.create_batch_async(
+            [{"contents": [Content(role="user", parts=[Part(text=q), pdf_part])]} for q in questions],
+            display_name=f"doc-assist:{file.filename}"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Gemini API error: {e}")
+    
+    await asyncio.to_thread(batch_questions.put, job.name, questions)
+    return DocAssistBatchResponse(
+        batch_id=job.name.removeprefix("batches/"),
+        state=job.state.value if job.state else "JOB_STATE_UNSPECIFIED",
+        questions=questions
+    )
+
+
+@router.get(
+    "/ask-batch/{batch_id}",
+    response_model=DocAssistBatchResponse,
+    responses={
+        500: {"description": "Gemini API error", "model": HTTPErrorResponse}
+    },
+    summary="Get Batch Job Status and Answers",
+    description="Returns the job state, and the answers in question order once it has succeeded."
+)
+async def get_question_batch(batch_id: str) -> DocAssistBatchResponse:
+    try:
+        job = await gemini.get_batch_async(f"batches/{batch_id}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Gemini API error: {e}")
+    
+    state = job.state.value if job.state else "JOB_STATE_UNSPECIFIED"
+    answers = None
+    if state == "JOB_STATE_SUCCEEDED" and job.dest and job.dest.inlined_responses:
+        # Inline results come back in request order
+        answers = [
+            item.response.text if item.response else None
+            for item in job.dest.inlined_responses
+        ]
+    
+    questions = await asyncio.to_thread(batch_questions.get, job.name)
+    return DocAssistBatchResponse(
+        batch_id=batch_id,
+        state=state,
+        questions=questions or [],
+        answers=answers
+    )
+
+
 @router.get(
     "/",
     response_model=DocAssistRootResponse,
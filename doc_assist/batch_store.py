@@ -0,0 +1,65 @@
+"""
+On-disk record of the questions in each submitted batch job.
+
+Gemini returns batch results in request order but not the requests themselves,
+so the questions are kept here, keyed by job name, to pair them with the
+answers. SQLite is shared by every worker on the host and survives restarts;
+each call opens its own short-lived connection so it is safe from any thread.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from typing import List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_questions (
+    job_name TEXT PRIMARY KEY,
+    questions TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+class BatchQuestionStore:
+    """
+    SQLite-backed map of batch job name -> submitted questions.
+
+    Args:
+        path: SQLite database file (created if missing).
+        ttl_seconds: How long a job's questions are kept (Gemini keeps batch results for up to 48h).
+    """
+
+    def __init__(self, path: str, ttl_seconds: float):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        with self._connect() as conn:
+            conn.execute(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def put(self, job_name: str, questions: List[str]) -> None:
+        """Record a job's questions and drop jobs older than the TTL."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM batch_questions WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                "INSERT OR REPLACE INTO batch_questions (job_name, questions, created_at) VALUES (?, ?, ?)",
+                (job_name, json.dumps(questions), now)
+            )
+        conn.close()
+
+    def get(self, job_name: str) -> Optional[List[str]]:
+        """Questions for a job in submission order, or None if unknown or expired."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT questions FROM batch_questions WHERE job_name = ? AND created_at >= ?",
+                (job_name, time.time() - self.ttl_seconds)
+            ).fetchone()
+        conn.close()
+        return json.loads(row[0]) if row else None
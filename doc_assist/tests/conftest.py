@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+# doc_assist is not a package, so put the repository root on the path for
+# "from doc_assist.api import ..." and "from services import ..."
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+# The shared Gemini client is built at import time; no request is sent
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
@@ -0,0 +1,210 @@
+import io
+import re
+
+import pymupdf
+import pytest
+from fastapi import HTTPException
+
+from doc_assist import api
+from doc_assist.api import answer_etag, count_pdf_pages, etag_matches, scan_pdf_pages, validate_pdf_pages
+
+
+def write_pdf(objects: list[str]) -> bytes:
+    """Uncompressed PDF whose objects 1..n are `objects`; object 1 is the catalog."""
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode())
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+PAGE = "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>"
+
+
+def build_pdf(pages: int, count: int | None = None) -> bytes:
+    """PDF with `pages` page objects and a /Count of `count`."""
+    kids = " ".join(f"{3 + i} 0 R" for i in range(pages))
+    return write_pdf([
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {pages if count is None else count} >>",
+        *[PAGE] * pages,
+    ])
+
+
+def append_update(data: bytes, objects: dict[int, str]) -> bytes:
+    """`data` plus an incremental update that (re)writes the numbered objects."""
+    prev = int(data.rsplit(b"startxref", 1)[1].split()[0])
+    size = int(re.findall(rb"/Size (\d+)", data)[-1])
+    out = io.BytesIO(data)
+    out.seek(0, io.SEEK_END)
+    offsets = {}
+    for number, body in sorted(objects.items()):
+        offsets[number] = out.tell()
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode())
+    xref = out.tell()
+    out.write(b"xref\n")
+    for number, offset in offsets.items():
+        out.write(f"{number} 1\n{offset:010d} 00000 n \n".encode())
+    size = max(size, max(objects) + 1)
+    out.write(f"trailer\n<< /Size {size} /Root 1 0 R /Prev {prev} >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def compressed_pdf(pages: int) -> bytes:
+    """PDF with its page objects inside a compressed object stream."""
+    with pymupdf.open() as doc:
+        for _ in range(pages):
+            doc.new_page()
+        return doc.tobytes(use_objstms=1, garbage=3)
+
+
+@pytest.fixture(params=["pymupdf", "pypdf2"])
+def parser(request, monkeypatch):
+    if request.param == "pypdf2":
+        monkeypatch.setattr(api, "pymupdf", None)
+    return request.param
+
+
+def test_count_pdf_pages(parser):
+    assert count_pdf_pages(build_pdf(3)) == 3
+    assert count_pdf_pages(compressed_pdf(25)) == 25
+
+
+def test_count_pdf_pages_takes_the_larger_of_tree_and_count(parser):
+    assert count_pdf_pages(build_pdf(30, count=1)) == 30
+    assert count_pdf_pages(build_pdf(2, count=500)) == 500
+
+
+def test_count_pdf_pages_walks_nested_page_tree(parser):
+    # Root (forged /Count 1) -> two /Pages nodes of 15 pages each; the second
+    # keeps its /Kids in an indirect array (object 5)
+    first = " ".join(f"{6 + i} 0 R" for i in range(15))
+    second = " ".join(f"{21 + i} 0 R" for i in range(15))
+    data = write_pdf([
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R 4 0 R] /Count 1 >>",
+        f"<< /Type /Pages /Parent 2 0 R /Kids [{first}] /Count 15 >>",
+        "<< /Type /Pages /Parent 2 0 R /Kids 5 0 R /Count 15 >>",
+        f"[{second}]",
+        *[PAGE] * 30,
+    ])
+    assert count_pdf_pages(data) == 30
+
+
+def test_count_pdf_pages_counts_every_listing_of_a_page(parser):
+    # One page object listed 100 times; /Count claims a single page
+    kids = " ".join(["3 0 R"] * 100)
+    data = write_pdf([
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count 1 >>",
+        PAGE,
+    ])
+    assert count_pdf_pages(data) == 100
+    assert count_pdf_pages(data, limit=20) == 21
+    with pytest.raises(HTTPException):
+        validate_pdf_pages(data)
+
+
+def test_count_pdf_pages_stops_at_page_tree_cycles(parser):
+    # Object 3 lists its own parent among its kids
+    data = write_pdf([
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Pages /Parent 2 0 R /Kids [2 0 R 4 0 R 4 0 R] /Count 2 >>",
+        PAGE,
+    ])
+    assert count_pdf_pages(data) == 2
+
+
+def test_scan_counts_page_objects_but_not_page_tree_nodes():
+    assert scan_pdf_pages(build_pdf(3)) == 3
+    assert scan_pdf_pages(build_pdf(30, count=1)) == 30
+
+
+def test_scan_counts_pages_rewritten_by_incremental_updates_once():
+    original = build_pdf(3)
+    update = b"3 0 obj\n<< /Type /Page /Parent 2 0 R /Rotate 90 >>\nendobj\n"
+    assert scan_pdf_pages(original + update + update) == 3
+
+
+def test_scan_undercounts_compressed_pages():
+    data = compressed_pdf(25)
+    assert scan_pdf_pages(data) < count_pdf_pages(data)
+
+
+def test_validate_accepts_pdf_within_the_page_limit():
+    validate_pdf_pages(build_pdf(20))
+    validate_pdf_pages(compressed_pdf(20))
+
+
+@pytest.mark.parametrize("data", [build_pdf(30), build_pdf(30, count=1), compressed_pdf(25)])
+def test_validate_rejects_pdf_over_the_page_limit(data):
+    with pytest.raises(HTTPException) as exc:
+        validate_pdf_pages(data)
+    assert exc.value.status_code == 400
+    assert "20-page limit" in exc.value.detail
+
+
+def test_validate_accepts_pages_replaced_by_an_incremental_update(parser):
+    # The update points the page tree at 20 new page objects; the 20 old ones
+    # stay in the file, so the scan sees 40
+    original = build_pdf(20)
+    kids = " ".join(f"{23 + i} 0 R" for i in range(20))
+    data = append_update(original, {
+        2: f"<< /Type /Pages /Kids [{kids}] /Count 20 >>",
+        **{23 + i: PAGE for i in range(20)},
+    })
+    assert scan_pdf_pages(data) == 40
+    assert count_pdf_pages(data) == 20
+    validate_pdf_pages(data)
+
+
+def test_validate_rejects_a_scan_far_past_the_limit_without_parsing(monkeypatch):
+    monkeypatch.setattr(api, "count_pdf_pages", lambda data, limit=None: pytest.fail("parsed"))
+    with pytest.raises(HTTPException) as exc:
+        validate_pdf_pages(build_pdf(41))
+    assert "20-page limit" in exc.value.detail
+
+
+def test_validate_uses_the_real_count_when_the_scan_undercounts(monkeypatch):
+    monkeypatch.setattr(api, "scan_pdf_pages", lambda data: 0)
+    with pytest.raises(HTTPException) as exc:
+        validate_pdf_pages(build_pdf(21))
+    assert "20-page limit" in exc.value.detail
+
+
+@pytest.mark.parametrize("data", [b"not a pdf", b"%PDF-1.4\ngarbage"])
+def test_validate_rejects_unreadable_files(data):
+    with pytest.raises(HTTPException) as exc:
+        validate_pdf_pages(data)
+    assert exc.value.status_code == 400
+    assert "corrupted" in exc.value.detail
+
+
+def test_answer_etag_depends_on_document_and_question():
+    etag = answer_etag(b"%PDF-doc", "What is the rate?")
+    assert etag.startswith('"') and etag.endswith('"')
+    assert answer_etag(b"%PDF-doc", "  What is the rate? ") == etag
+    assert answer_etag(b"%PDF-other", "What is the rate?") != etag
+    assert answer_etag(b"%PDF-doc", "What is the term?") != etag
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ("*", True),
+    ('"xyz"', False),
+    ("abc", False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
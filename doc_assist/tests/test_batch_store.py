@@ -0,0 +1,34 @@
+from doc_assist import batch_store
+from doc_assist.batch_store import BatchQuestionStore
+
+
+def test_questions_round_trip_in_order(tmp_path):
+    store = BatchQuestionStore(str(tmp_path / "batches.sqlite3"), ttl_seconds=60)
+    store.put("batches/a", ["What is the rate?", "What is the term?"])
+
+    assert store.get("batches/a") == ["What is the rate?", "What is the term?"]
+    assert store.get("batches/unknown") is None
+
+
+def test_questions_are_shared_between_store_instances(tmp_path):
+    path = str(tmp_path / "nested" / "batches.sqlite3")
+    BatchQuestionStore(path, ttl_seconds=60).put("batches/a", ["q"])
+
+    # Another worker, or the same one after a restart
+    assert BatchQuestionStore(path, ttl_seconds=60).get("batches/a") == ["q"]
+
+
+def test_expired_jobs_are_hidden_and_purged(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(batch_store.time, "time", lambda: now[0])
+    store = BatchQuestionStore(str(tmp_path / "batches.sqlite3"), ttl_seconds=60)
+    store.put("batches/old", ["old"])
+
+    now[0] += 61
+    assert store.get("batches/old") is None
+
+    store.put("batches/new", ["new"])
+    with store._connect() as conn:
+        rows = conn.execute("SELECT job_name FROM batch_questions").fetchall()
+    conn.close()
+    assert rows == [("batches/new",)]
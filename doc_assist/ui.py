@@ -12,16 +12,15 @@ if not api_key:
     st.stop()
 
 # --- Helper Functions ---
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
+def _ask_gemini_about_pdf(question, pdf_content):
+    """Gemini answer for a (question, PDF) pair; Streamlit caches it by content, errors are not cached."""
+    return get_gemini_client().answer_pdf(question, pdf_content)
+
 def get_gemini_response_doc(question, pdf_content):
     """Sends the user's question and PDF content to the Gemini API."""
-    gemini = get_gemini_client()
-    
-    # The Gemini API can take the raw bytes of the PDF directly.
-    pdf_part = {"mime_type": "application/pdf", "data": pdf_content}
-    
     try:
-        response = gemini.generate_content([question, pdf_part])
-        return response.text
+        return _ask_gemini_about_pdf(question, pdf_content)
     except Exception as e:
         return f"An error occurred: {e}"
 
@@ -1,20 +1,44 @@
 # app/api.py
+import asyncio
+import json
 import os
 import re
-from typing import Dict, List, Optional
-from fastapi import APIRouter, Path, Query
-from pydantic import BaseModel, Field
+import weakref
+import xxhash
+from collections import deque
+from cachetools import TTLCache
+from typing import AsyncIterator, Deque, Iterable, List
+from fastapi import APIRouter, HTTPException, Path, Query, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ConfigDict
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-from lf_assist.app.query_tagger import tag_query
-from lf_assist.app.retriever import get_relevant_chunks
-from lf_assist.app.summarizer import summarize
+from lf_assist.app.query_tagger import atag_queries
+from lf_assist.app.retriever import build_search_query, aget_relevant_chunks_batch
+from lf_assist.app.summarizer import asummarize_stream
+from lf_assist.app.qdrant_store import encode_batch, encode_cache_info
+from lf_assist.app.semantic_cache import SemanticCache, SHARED_SCOPE
 from app_logger import logger
 
-# Global conversation storage (session_id -> list of messages)
-conversation_store: Dict[str, List[BaseMessage]] = {}
+# Global conversation storage (session_id -> deque of messages), bounded so
+# idle sessions are evicted instead of accumulating for the process lifetime
+MAX_SESSIONS = int(os.getenv("LF_MAX_SESSIONS", "10000"))
+SESSION_TTL_SECONDS = int(os.getenv("LF_SESSION_TTL", "3600"))
+MAX_HISTORY_MESSAGES = 20
+conversation_store: TTLCache = TTLCache(maxsize=MAX_SESSIONS, ttl=SESSION_TTL_SECONDS)
+# A session's lock lives while a turn holds or awaits it, never evicted by age
+_session_locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
 
 TAG_PROMPT_PATH = os.path.join("lf_assist", "prompts", "query_tagger.txt")
 
+FAILED_ANSWER = "⚠️ Failed to generate response."
+
+# Splits on question marks and on " and " followed by a capitalised clause
+_SPLIT_RE = re.compile(r'\?\s*|\s+and\s+(?=[A-Z])')
+
+# Semantic cache of answers to standalone questions in Qdrant, shared by every
+# session (same embedder as retrieval)
+response_cache = SemanticCache()
+
 # Create router instead of app
 router = APIRouter(prefix="/lf-assist", tags=["LF Assist"])
 
@@ -35,14 +59,20 @@ class ChatRequest(BaseModel):
         default="default",
         description="Session ID for maintaining conversation context. Use same ID for follow-up questions."
     )
+    no_cache: bool = Field(
+        default=False,
+        description="Bypass the semantic response cache (use for sensitive prompts or to force a fresh answer)."
+    )
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "query": "How do I apply for a business loan?",
-                "session_id": "user_123_session_456"
+                "session_id": "user_123_session_456",
+                "no_cache": False
             }
         }
+    )
 
 
 class ChatResponse(BaseModel):
@@ -52,8 +82,8 @@ class ChatResponse(BaseModel):
     answer: str = Field(..., description="The generated answer based on company knowledge base")
     session_id: str = Field(..., description="Session ID for follow-up requests")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "query": "How do I apply for a business loan?",
                 "tags": ["loan_application", "business_loan", "process"],
@@ -61,16 +91,18 @@ class ChatResponse(BaseModel):
                 "session_id": "user_123_session_456"
             }
         }
+    )
 
 
 class ClearChatResponse(BaseModel):
     """Response for chat clear endpoint"""
     message: str = Field(..., description="Status message")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {"message": "Conversation cleared for session: user_123"}
         }
+    )
 
 
 class SessionListResponse(BaseModel):
@@ -78,13 +110,14 @@ class SessionListResponse(BaseModel):
     sessions: List[str] = Field(..., description="List of active session IDs")
     count: int = Field(..., description="Total number of active sessions")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "sessions": ["user_123", "user_456", "default"],
                 "count": 3
             }
         }
+    )
 
 
 class HistoryMessage(BaseModel):
@@ -99,8 +132,8 @@ class HistoryResponse(BaseModel):
     history: List[HistoryMessage] = Field(..., description="List of messages in conversation order")
     message_count: int = Field(..., description="Total number of messages in history")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "session_id": "user_123",
                 "history": [
@@ -110,43 +143,57 @@ class HistoryResponse(BaseModel):
                 "message_count": 2
             }
         }
+    )
 
-def get_conversation_history(session_id: str) -> List[BaseMessage]:
+class CacheStatsResponse(BaseModel):
+    """Query-embedding cache statistics"""
+    hits: int = Field(..., description="Lookups served from the cache")
+    misses: int = Field(..., description="Lookups that ran the embedding model")
+    maxsize: int = Field(..., description="Maximum number of cached embeddings")
+    currsize: int = Field(..., description="Number of embeddings currently cached")
+    hit_rate: float = Field(..., description="hits / (hits + misses)")
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {"hits": 120, "misses": 40, "maxsize": 2048, "currsize": 40, "hit_rate": 0.75}
+        }
+    )
+
+def get_conversation_history(session_id: str) -> Deque[BaseMessage]:
     """Get conversation history for a specific session"""
     if session_id not in conversation_store:
-        conversation_store[session_id] = []
+        conversation_store[session_id] = deque(maxlen=MAX_HISTORY_MESSAGES)
     return conversation_store[session_id]
 
 def add_to_conversation(session_id: str, message: BaseMessage):
-    """Add a message to conversation history"""
-    if session_id not in conversation_store:
-        conversation_store[session_id] = []
-    conversation_store[session_id].append(message)
+    """Add a message to conversation history (the deque drops the oldest past the limit)"""
+    history = get_conversation_history(session_id)
+    history.append(message)
     
-    if len(conversation_store[session_id]) > 20:
-        conversation_store[session_id] = conversation_store[session_id][-20:]
+    # Re-assign on every write so an active session's TTL is refreshed
+    conversation_store[session_id] = history
 
-def format_chat_history(messages: List[BaseMessage]) -> str:
+def format_chat_history(messages: Iterable[BaseMessage]) -> str:
     """Format message history as string for prompts"""
-    formatted = []
-    for msg in messages:
-        if isinstance(msg, HumanMessage):
-            formatted.append(f"User: {msg.content}")
-        elif isinstance(msg, AIMessage):
-            formatted.append(f"Assistant: {msg.content}")
-    return "\n".join(formatted)
+    return "\n".join(
+        f"User: {msg.content}" if isinstance(msg, HumanMessage) else f"Assistant: {msg.content}"
+        for msg in messages
+        if isinstance(msg, (HumanMessage, AIMessage))
+    )
 
-def format_chat_history_for_memory_dict(messages: List[BaseMessage]) -> dict:
+def format_chat_history_for_memory_dict(messages: Iterable[BaseMessage]) -> dict:
     """Format messages as dictionary for backward compatibility"""
+    # Snapshot as a list once: downstream consumers slice it, and the history
+    # string is built from the same snapshot
+    snapshot = list(messages)
     return {
-        "chat_history": messages,
-        "history": format_chat_history(messages)
+        "chat_history": snapshot,
+        "history": format_chat_history(snapshot)
     }
 
 def split_questions(query: str) -> list[str]:
     """Splits multi-question inputs into separate questions."""
-    parts = re.split(r'\?\s*|\s+and\s+(?=[A-Z])', query.strip())
-    return [p.strip() for p in parts if p.strip()]
+    return [p for p in (s.strip() for s in _SPLIT_RE.split(query.strip())) if p]
 
 def clear_conversation(session_id: str):
     """Clear conversation history for a specific session"""
@@ -158,61 +205,189 @@ def get_all_sessions() -> List[str]:
     """Get list of all active session IDs"""
     return list(conversation_store.keys())
 
-# Core logic extracted as callable function
-async def process_lf_chat(query: str, session_id: str = "default") -> ChatResponse:
+async def _tag_question(query: str) -> List[str]:
+    """Tags of a query as the pipeline computes them: per sub-question, de-duplicated."""
+    sub_questions = split_questions(query) or [query.strip()]
+    tags_per_question = await atag_queries(sub_questions, TAG_PROMPT_PATH)
+    return list(dict.fromkeys(tag for tags in tags_per_question for tag in tags))
+
+async def _lookup_cached(query: str, session_id: str, use_cache: bool):
     """
-    Core LF Assist logic - can be called directly from unified API
+    Check the shared semantic cache for `query`. Returns (cache_vector, cached)
+    where cache_vector is None when caching is disabled, the question is a
+    follow-up (the session has history, so the answer depends on more than its
+    text) or the lookup failed.
+    
+    A hit needs the same question literals (checked in the lookup) and the
+    same topic tags as the cached question, so a near-identical question about
+    another product or screen is answered afresh.
     """
-    logger.info(f"Received query: {query} (session: {session_id})")
+    if not use_cache or conversation_store.get(session_id):
+        return None, None
+    try:
+        cache_vector = await asyncio.to_thread(response_cache.embed, query)
+        cached = await asyncio.to_thread(response_cache.lookup, SHARED_SCOPE, query, cache_vector)
+        if cached is not None and set(await _tag_question(query)) != set(cached["tags"]):
+            logger.debug("Semantic cache candidate rejected: tags differ")
+            cached = None
+        return cache_vector, cached
+    except Exception as e:
+        logger.warning(f"Semantic cache lookup failed, continuing without cache: {e}")
+        return None, None
+
+async def _retrieve_context(query: str, messages: Iterable[BaseMessage]):
+    """
+    Split, tag and retrieve for a query. Returns (chat_history_dict, all_tags,
+    formatted_chunks) ready for summarization.
+    """
+    # A query that is only separators (e.g. "?") is still asked as typed
+    sub_questions = split_questions(query) or [query.strip()]
+    logger.debug("Detected %d sub-question(s): %s", len(sub_questions), sub_questions)
     
-    messages = get_conversation_history(session_id)
-    sub_questions = split_questions(query)
-    logger.debug(f"Detected {len(sub_questions)} sub-question(s): {sub_questions}")
+    # Format history once; it is shared by retrieval and summarization
+    chat_history_dict = format_chat_history_for_memory_dict(messages)
     
-    all_chunks = []
-    all_tags = []
+    # Embed all sub-questions in one batch while tagging them in one LLM call
+    search_queries = [build_search_query(q, chat_history_dict) for q in sub_questions]
+    query_vectors, tags_per_question = await asyncio.gather(
+        asyncio.to_thread(encode_batch, search_queries),
+        atag_queries(sub_questions, TAG_PROMPT_PATH),
+        return_exceptions=True
+    )
+    if isinstance(query_vectors, Exception):
+        logger.error(f"Error embedding sub-questions: {query_vectors}")
+        query_vectors = None
+    if isinstance(tags_per_question, Exception):
+        logger.error(f"Error tagging query: {tags_per_question}")
+        tags_per_question = [[] for _ in sub_questions]
     
-    for q in sub_questions:
-        try:
-            tags = tag_query(q, TAG_PROMPT_PATH)
-            logger.debug(f"Tags for '{q}': {tags}")
-        except Exception as e:
-            logger.error(f"Error tagging query: {e}")
-            tags = []
-        
-        all_tags.extend(tags)
-        
-        try:
-            chat_history_dict = format_chat_history_for_memory_dict(messages)
-            chunks = get_relevant_chunks(q, tags, chat_history=chat_history_dict)
-            logger.debug(f"Retrieved {len(chunks)} chunks for '{q}'")
-            all_chunks.extend(chunks)
-        except Exception as e:
-            logger.error(f"Retrieval Error: {e}")
+    for q, tags in zip(sub_questions, tags_per_question):
+        logger.debug("Tags for '%s': %s", q, tags)
     
-    all_chunks = list(set(all_chunks))
-    formatted_chunks = [{"content": c} for c in all_chunks]
+    # Retrieve for every sub-question in one batched Qdrant round trip
+    results = [[] for _ in sub_questions]
+    try:
+        results = await aget_relevant_chunks_batch(
+            sub_questions, tags_per_question, chat_history=chat_history_dict, query_vectors=query_vectors
+        )
+    except Exception as e:
+        logger.error(f"Retrieval Error: {e}")
+    
+    # Single question (the common case): one fused result list whose points
+    # are already unique, so there is nothing to merge
+    if len(sub_questions) == 1:
+        return chat_history_dict, tags_per_question[0], [{"content": c} for c in results[0]]
+    
+    all_tags = [tag for tags in tags_per_question for tag in tags]
     
-    # Removed verbose conversation history logging
+    # Order-preserving dedupe so identical queries yield byte-identical prompts
+    unique_chunks = {}
+    keep = unique_chunks.setdefault
+    digest = xxhash.xxh3_64_intdigest
+    for chunks in results:
+        for c in chunks:
+            keep(digest(c), c)
+    formatted_chunks = [{"content": c} for c in unique_chunks.values()]
     
+    return chat_history_dict, all_tags, formatted_chunks
+
+async def _record_answer(session_id: str, query: str, answer: str, tags: List[str], cache_vector=None):
+    """Append the exchange to the session history and, if given a vector, to the cache."""
+    add_to_conversation(session_id, HumanMessage(content=query))
+    add_to_conversation(session_id, AIMessage(content=answer))
+    if cache_vector is not None:
+        await asyncio.to_thread(response_cache.add, SHARED_SCOPE, query, cache_vector, {"tags": tags, "answer": answer})
+
+def _session_lock(session_id: str) -> asyncio.Lock:
+    """Per-session lock; dropped once no turn holds or waits on it."""
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = _session_locks[session_id] = asyncio.Lock()
+    return lock
+
+async def _lf_chat_events(query: str, session_id: str, use_cache: bool) -> AsyncIterator[dict]:
+    """
+    The LF Assist pipeline as a stream of events: one "meta" event with the
+    tags, "token" events with answer text as Gemini produces it, then a "done"
+    event with the full answer. The exchange is recorded before "done".
+    """
+    cache_vector, cached = await _lookup_cached(query, session_id, use_cache)
+    if cached is not None:
+        logger.info(f"Serving cached answer for session: {session_id}")
+        await _record_answer(session_id, query, cached["answer"], cached["tags"])
+        yield {"type": "meta", "tags": cached["tags"], "session_id": session_id}
+        yield {"type": "token", "text": cached["answer"]}
+        yield {"type": "done", "answer": cached["answer"]}
+        return
+    
+    messages = get_conversation_history(session_id)
+    chat_history_dict, all_tags, formatted_chunks = await _retrieve_context(query, messages)
+    tags = list(dict.fromkeys(all_tags))
+    yield {"type": "meta", "tags": tags, "session_id": session_id}
+    
+    parts = []
+    summarized = False
     try:
-        chat_history_dict = format_chat_history_for_memory_dict(messages)
-        answer = summarize(query, formatted_chunks, chat_history=chat_history_dict)
+        async for text in asummarize_stream(query, formatted_chunks, chat_history=chat_history_dict):
+            parts.append(text)
+            yield {"type": "token", "text": text}
+        summarized = True
     except Exception as e:
         logger.error(f"Error summarizing: {e}")
-        answer = "⚠️ Failed to generate response."
+        parts.append(("\n" if parts else "") + FAILED_ANSWER)
+        yield {"type": "token", "text": parts[-1]}
     
-    add_to_conversation(session_id, HumanMessage(content=query))
-    add_to_conversation(session_id, AIMessage(content=answer))
+    answer = "".join(parts)
+    await _record_answer(session_id, query, answer, tags, cache_vector if summarized else None)
+    logger.info("Final Answer: %.100s...", answer)
+    yield {"type": "done", "answer": answer}
+
+# Core logic extracted as callable function
+async def process_lf_chat(query: str, session_id: str = "default", use_cache: bool = True) -> ChatResponse:
+    """
+    Core LF Assist logic - can be called directly from unified API.
+    Drains the same event stream as /chat/stream and returns the final answer.
+    """
+    logger.info(f"Received query: {query} (session: {session_id})")
+    
+    tags: List[str] = []
+    answer = ""
+    # Turns within a session run one at a time so a follow-up sees the previous
+    # answer; different sessions still run concurrently
+    async with _session_lock(session_id):
+        async for event in _lf_chat_events(query, session_id, use_cache):
+            if event["type"] == "meta":
+                tags = event["tags"]
+            elif event["type"] == "done":
+                answer = event["answer"]
     
-    logger.info(f"Final Answer: {answer[:100]}...")
     return ChatResponse(
         query=query,
-        tags=list(set(all_tags)),
+        tags=tags,
         answer=answer,
         session_id=session_id
     )
 
+def _sse(payload: dict) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+async def stream_lf_chat(query: str, session_id: str = "default", use_cache: bool = True) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of process_lf_chat, yielding the pipeline events as
+    SSE messages.
+    """
+    logger.info(f"Received streaming query: {query} (session: {session_id})")
+    
+    async with _session_lock(session_id):
+        async for event in _lf_chat_events(query, session_id, use_cache):
+            yield _sse(event)
+
+def _require_question(query: str):
+    """Reject queries with no question text (whitespace or punctuation only)."""
+    if not split_questions(query):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Query must contain a question")
+
 # Router endpoints
 @router.post(
     "/chat", 
@@ -234,7 +409,30 @@ async def process_lf_chat(query: str, session_id: str = "default") -> ChatRespon
     """
 )
 async def chat(request: ChatRequest) -> ChatResponse:
-    return await process_lf_chat(request.query, request.session_id)
+    _require_question(request.query)
+    return await process_lf_chat(request.query, request.session_id, use_cache=not request.no_cache)
+
+
+@router.post(
+    "/chat/stream",
+    summary="Company Knowledge Chat (streaming)",
+    description="""
+    Same as `/chat`, but streams the answer as Server-Sent Events so the client
+    can render text as soon as Gemini produces it.
+    
+    Each event is a `data:` line holding a JSON object:
+    - `{"type": "meta", "tags": [...], "session_id": "..."}` once retrieval is done
+    - `{"type": "token", "text": "..."}` for each piece of the answer
+    - `{"type": "done", "answer": "..."}` with the complete answer
+    """
+)
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    _require_question(request.query)
+    return StreamingResponse(
+        stream_lf_chat(request.query, request.session_id, use_cache=not request.no_cache),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.post(
@@ -272,7 +470,8 @@ async def get_history(
     session_id: str = Path(..., description="The session ID to get history for")
 ) -> HistoryResponse:
     """Get conversation history for a specific session"""
-    messages = get_conversation_history(session_id)
+    # Read-only: don't create (and LRU-promote) an entry for unknown sessions
+    messages = conversation_store.get(session_id, ())
     history = []
     for msg in messages:
         history.append(HistoryMessage(
@@ -280,3 +479,22 @@ async def get_history(
             content=msg.content
         ))
     return HistoryResponse(session_id=session_id, history=history, message_count=len(messages))
+
+
+@router.get(
+    "/cache/stats",
+    response_model=CacheStatsResponse,
+    summary="Embedding Cache Stats",
+    description="Hit/miss counters of the in-process query-embedding cache. Useful for admin/debug purposes."
+)
+async def cache_stats() -> CacheStatsResponse:
+    """Report query-embedding cache statistics"""
+    info = encode_cache_info()
+    lookups = info.hits + info.misses
+    return CacheStatsResponse(
+        hits=info.hits,
+        misses=info.misses,
+        maxsize=info.maxsize,
+        currsize=info.currsize,
+        hit_rate=info.hits / lookups if lookups else 0.0
+    )
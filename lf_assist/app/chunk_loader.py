@@ -1,28 +1,87 @@
-import pdfplumber
+import pymupdf
+import os
 import re
 import json
+import textwrap
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+
+# Documents with at least this many pages are extracted in parallel,
+# PAGES_PER_WORKER_TASK pages per task across CPU-count processes
+PARALLEL_MIN_PAGES = 10
+PAGES_PER_WORKER_TASK = 5
+
+_SEG_RE = re.compile(
+    r"--- START SEGMENT ---\s*TAGS:\s*\[(.*?)\]\s*CONTENT:\s*((?:.|\n)*?)--- END SEGMENT ---",
+    re.MULTILINE
+)
+
+
+def _extract_page_range(args: tuple[str, int, int]) -> list[str]:
+    """Worker: text of pages [start, stop) (each process opens the file itself)."""
+    pdf_path, start, stop = args
+    with pymupdf.open(pdf_path) as pdf:
+        return [pdf[i].get_text() for i in range(start, stop)]
+
+
+def iter_page_texts(pdf_path: str) -> Iterator[str]:
+    """Yield page texts in order, extracting large documents across processes."""
+    with pymupdf.open(pdf_path) as pdf:
+        page_count = pdf.page_count
+        if page_count < PARALLEL_MIN_PAGES or (os.cpu_count() or 1) < 2:
+            for page in pdf:
+                yield page.get_text()
+            return
+
+    ranges = [
+        (pdf_path, start, min(start + PAGES_PER_WORKER_TASK, page_count))
+        for start in range(0, page_count, PAGES_PER_WORKER_TASK)
+    ]
+    with ProcessPoolExecutor() as executor:
+        for texts in executor.map(_extract_page_range, ranges):
+            yield from texts
+
+
+def iter_chunks(pdf_path: str) -> Iterator[dict]:
+    """
+    Yield {"tags", "content"} segments page by page.
+
+    Page text is appended to a rolling buffer and every complete segment is
+    yielded and dropped from it, so only the unfinished tail is held in memory
+    instead of the whole document text plus a list of all matches.
+    """
+    buffer = ""
+    for text in iter_page_texts(pdf_path):
+        if not text:
+            continue
+        buffer += text if text.endswith("\n") else text + "\n"
+
+        end = 0
+        for m in _SEG_RE.finditer(buffer):
+            tags_text, content_text = m.groups()
+            yield {
+                "tags": [tag.strip() for tag in tags_text.split(",")],
+                "content": content_text.strip()
+            }
+            end = m.end()
+        if end:
+            buffer = buffer[end:]
+
 
 def load_chunks(pdf_path: str) -> list:
-    with pdfplumber.open(pdf_path) as pdf:
-        full_text = "\n".join(page.extract_text() for page in pdf.pages if page.extract_text())
-
-    pattern = re.compile(
-        r"--- START SEGMENT ---\s*TAGS:\s*\[(.*?)\]\s*CONTENT:\s*((?:.|\n)*?)--- END SEGMENT ---",
-        re.MULTILINE
-    )
-
-    matches = pattern.findall(full_text)
-    print(f"✅ Found {len(matches)} segments in the PDF.")
-
-    chunks = []
-    for tags_text, content_text in matches:
-        tags = [tag.strip() for tag in tags_text.split(",")]
-        content = content_text.strip()
-        chunks.append({"tags": tags, "content": content})
+    chunks = list(iter_chunks(pdf_path))
+    print(f"✅ Found {len(chunks)} segments in the PDF.")
     return chunks
 
 
-def save_chunks_to_json(chunks, path: str):
+def save_chunks_to_json(chunks: Iterable[dict], path: str):
+    """Write chunks as a JSON array one item at a time (accepts a generator)."""
+    count = 0
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(chunks, f, indent=2, ensure_ascii=False)
-    print(f"✅ Saved {len(chunks)} chunks to {path}")
+        f.write("[")
+        for chunk in chunks:
+            f.write(",\n" if count else "\n")
+            f.write(textwrap.indent(json.dumps(chunk, indent=2, ensure_ascii=False), "  "))
+            count += 1
+        f.write("\n]" if count else "]")
+    print(f"✅ Saved {count} chunks to {path}")
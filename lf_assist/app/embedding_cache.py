@@ -0,0 +1,89 @@
+"""
+On-disk cache of chunk embeddings for ingestion.
+
+Re-uploading the manual re-embeds every chunk. This SQLite store keeps
+sha256(content) -> float32 vector per embedding model, so unchanged chunks are
+read back instead of encoded again and only new or edited chunks hit the model.
+"""
+
+import hashlib
+import os
+import sqlite3
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Keys per SELECT ... IN (...) (SQLite's default host-parameter limit is 999)
+_LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    content_sha256 BLOB NOT NULL,
+    model TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    vec BLOB NOT NULL,
+    PRIMARY KEY (content_sha256, model)
+)
+"""
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed embedding cache, scoped to one embedding model.
+
+    Args:
+        path: SQLite database file (created if missing).
+        model: Model identifier; vectors from other models are never returned.
+    """
+
+    def __init__(self, path: str, model: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.model = model
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(_SCHEMA)
+
+    @staticmethod
+    def key(content: str) -> bytes:
+        return hashlib.sha256(content.encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        row = self._conn.execute(
+            "SELECT vec FROM embeddings WHERE content_sha256 = ? AND model = ?",
+            (key, self.model)
+        ).fetchone()
+        return np.frombuffer(row[0], dtype=np.float32) if row else None
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        """Vectors for `keys` in order (None for misses), fetched in batched queries."""
+        found = {}
+        for start in range(0, len(keys), _LOOKUP_BATCH):
+            batch = keys[start:start + _LOOKUP_BATCH]
+            rows = self._conn.execute(
+                f"SELECT content_sha256, vec FROM embeddings "
+                f"WHERE model = ? AND content_sha256 IN ({','.join('?' * len(batch))})",
+                (self.model, *batch)
+            )
+            found.update((key, np.frombuffer(vec, dtype=np.float32)) for key, vec in rows)
+        return [found.get(key) for key in keys]
+
+    def put_many(self, items: Iterable[Tuple[bytes, np.ndarray]]) -> None:
+        """Store (key, vector) pairs in a single transaction."""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (content_sha256, model, dim, vec) VALUES (?, ?, ?, ?)",
+                (
+                    (key, self.model, len(vec), np.asarray(vec, dtype=np.float32).tobytes())
+                    for key, vec in items
+                )
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "EmbeddingCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
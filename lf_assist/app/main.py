@@ -1,19 +1,19 @@
-from langchain_classic.memory import ConversationBufferMemory
+import logging
+from collections import deque
 from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage, AIMessage
 from lf_assist.app.retriever import get_relevant_chunks
 from lf_assist.app.summarizer import summarize
 from lf_assist.app.query_tagger import tag_query
+from app_logger import logger
 
 load_dotenv()
 
 TAG_PROMPT_PATH = "prompts/query_tagger.txt"
 
-# Initialize memory
-memory = ConversationBufferMemory(
-    return_messages=True,
-    memory_key="chat_history",
-    input_key="input"
-)
+# Keep the last K exchanges (user + bot message each) for this session
+HISTORY_EXCHANGES = 3
+history = deque(maxlen=2 * HISTORY_EXCHANGES)
 
 print("\n💬 LMS Chatbot (type 'exit' to quit)")
 print("👉 You can ask follow-up questions in the same session.\n")
@@ -29,36 +29,35 @@ while True:
     try:
         tags = tag_query(user_input, TAG_PROMPT_PATH)
     except Exception as e:
-        print("⚠️ Error tagging query:", e)
+        logger.error("Error tagging query: %s", e)
         tags = []
 
     try:
         retrieved_chunks = get_relevant_chunks(user_input, tags)
     except Exception as e:
-        print("❌ Retrieval Error:", e)
+        logger.error("Retrieval Error: %s", e)
         retrieved_chunks = []
 
     # Filter and format chunks
     formatted_chunks = [{"content": c} for c in retrieved_chunks if c]
 
-    # 🔍 Print the retrieved chunks
+    # 🔍 Log the retrieved chunks (only rendered when DEBUG is enabled)
     if formatted_chunks:
-        print("\n📚 Retrieved Chunks:")
-        for idx, chunk in enumerate(formatted_chunks, 1):
-            print(f"\n--- Chunk {idx} ---\n{chunk['content']}")
-        print("\n")  # Extra spacing
+        if logger.isEnabledFor(logging.DEBUG):
+            for idx, chunk in enumerate(formatted_chunks, 1):
+                logger.debug("Chunk %d:\n%s", idx, chunk["content"])
     else:
-        print("⚠️ No relevant chunks retrieved.\n")
+        logger.debug("No relevant chunks retrieved for: %s", user_input)
 
     try:
         if formatted_chunks:
-            response = summarize(user_input, formatted_chunks, memory=memory)
-            memory.chat_memory.add_user_message(user_input)
-            memory.chat_memory.add_ai_message(response)
+            response = summarize(user_input, formatted_chunks, chat_history={"chat_history": list(history)})
+            history.append(HumanMessage(content=user_input))
+            history.append(AIMessage(content=response))
         else:
             response = "⚠️ No relevant information found in the manual for your query."
     except Exception as e:
         response = "⚠️ Failed to generate response."
-        print("Gemini Error:", e)
+        logger.error("Gemini Error: %s", e)
 
     print(f"Bot: {response}\n")
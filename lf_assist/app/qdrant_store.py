@@ -7,11 +7,24 @@ from qdrant_client.http.models import (
     PointStruct,
     Filter,
     FieldCondition,
-    MatchValue
+    MatchAny,
+    PayloadSchemaType,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    QuantizationSearchParams,
+    Prefetch,
+    QueryRequest,
+    FusionQuery,
+    Fusion,
+    HnswConfigDiff,
+    OptimizersConfigDiff
 )
 from sentence_transformers import SentenceTransformer
 import uuid
-import requests
+from functools import lru_cache
+from lf_assist.app.embedding_cache import EmbeddingCache
 
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
@@ -23,24 +36,83 @@ client = QdrantClient(
     prefer_grpc=True
 )
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+# LF_EMBED_BACKEND=onnx runs the int8-quantized ONNX export of the same model
+# (needs optimum[onnxruntime]); vectors stay 384-dim and comparable
+EMBED_BACKEND = os.getenv("LF_EMBED_BACKEND", "torch").lower()
+EMBED_ONNX_FILE = os.getenv("LF_EMBED_ONNX_FILE", "model_qint8_avx512_vnni.onnx")
+# LF_EMBED_DEVICE=cuda moves the torch model to the GPU in fp16; the default
+# keeps CPU/fp32 so dev and CI machines behave as before
+EMBED_DEVICE = os.getenv("LF_EMBED_DEVICE", "cpu").lower()
+
+def _load_model() -> SentenceTransformer:
+    if EMBED_BACKEND == "onnx":
+        return SentenceTransformer(
+            EMBED_MODEL_NAME,
+            backend="onnx",
+            model_kwargs={"file_name": EMBED_ONNX_FILE}
+        )
+    if EMBED_DEVICE.startswith("cuda"):
+        import torch
+        if torch.cuda.is_available():
+            return SentenceTransformer(EMBED_MODEL_NAME, device=EMBED_DEVICE).half()
+        print(f"⚠️ LF_EMBED_DEVICE={EMBED_DEVICE} but CUDA is not available, using CPU.")
+    return SentenceTransformer(EMBED_MODEL_NAME)
+
+model = _load_model()
+EMBED_BATCH_SIZE = 32
+# Ingest: larger encode batches, and upserts split so no single gRPC message
+# carries the whole manual
+INGEST_BATCH_SIZE = 96
+UPSERT_BATCH_SIZE = 256
+# Chunk embeddings from previous uploads, keyed by content hash and model
+EMBED_CACHE_PATH = os.getenv("LF_EMBED_CACHE_PATH", "data/embedding_cache.sqlite3")
+TAG_SCAN_LIMIT = int(os.getenv("LF_TAG_SCAN_LIMIT", "1000"))
+
+# int8 scalar quantization: 4x smaller vectors kept in RAM for the HNSW scan,
+# with the top candidates rescored against the original float32 vectors
+QUANTIZATION_CONFIG = ScalarQuantization(
+    scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+)
+
+# HNSW tuning. m / ef_construct apply when the collection is (re)built;
+# hnsw_ef is the per-query beam width. indexed_only skips the unindexed write
+# buffer, but returns nothing for collections below the indexing threshold, so
+# it is opt-in.
+HNSW_M = int(os.getenv("QDRANT_HNSW_M", "32"))
+HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "256"))
+HNSW_EF = int(os.getenv("QDRANT_HNSW_EF", "128"))
+INDEXING_THRESHOLD_KB = int(os.getenv("QDRANT_INDEXING_THRESHOLD", "5000"))
+INDEXED_ONLY = os.getenv("QDRANT_INDEXED_ONLY", "false").lower() == "true"
+
+# Original float32 vectors live on disk and are only read to rescore the
+# oversampled int8 candidates; the quantized copies stay in RAM
+VECTORS_ON_DISK = os.getenv("QDRANT_VECTORS_ON_DISK", "true").lower() == "true"
+QUANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+
+SEARCH_PARAMS = SearchParams(
+    hnsw_ef=HNSW_EF,
+    indexed_only=INDEXED_ONLY,
+    quantization=QuantizationSearchParams(rescore=True, oversampling=QUANT_OVERSAMPLING)
+)
 
 def set_tags_payload_index():
-    url = f"{QDRANT_URL}/collections/{QDRANT_COLLECTION}/index"
-    headers = {
-        "Content-Type": "application/json",
-        "api-key": QDRANT_API_KEY
-    }
-    data = {
-        "field_name": "tags",
-        "field_schema": "keyword"
-    }
-
-    response = requests.put(url, headers=headers, json=data)
-    if response.status_code != 200:
-        raise Exception(f"❌ Failed to set payload index: {response.text}")
+    """
+    Creates the keyword index on `tags` so tag filters are resolved from the
+    payload index during HNSW traversal instead of checking every point.
+    """
+    client.create_payload_index(
+        collection_name=QDRANT_COLLECTION,
+        field_name="tags",
+        field_schema=PayloadSchemaType.KEYWORD,
+        wait=True
+    )
     print("✅ 'tags' payload index created successfully.")
 
+def _tags_filter(tags: list[str]) -> Filter:
+    """Single indexed `tags IN (...)` condition (matches points having any of the tags)."""
+    return Filter(must=[FieldCondition(key="tags", match=MatchAny(any=list(tags)))])
+
 def upsert_chunks(chunks: list[dict]):
     existing = [col.name for col in client.get_collections().collections]
     if QDRANT_COLLECTION in existing:
@@ -48,67 +120,219 @@ def upsert_chunks(chunks: list[dict]):
 
     client.recreate_collection(
         collection_name=QDRANT_COLLECTION,
-        vectors_config=VectorParams(size=384, distance=Distance.COSINE)
+        # Every vector is unit-length (normalize_embeddings=True), so a plain dot
+        # product ranks exactly like cosine without normalizing at search time
+        vectors_config=VectorParams(size=384, distance=Distance.DOT, on_disk=VECTORS_ON_DISK),
+        hnsw_config=HnswConfigDiff(m=HNSW_M, ef_construct=HNSW_EF_CONSTRUCT),
+        optimizers_config=OptimizersConfigDiff(indexing_threshold=INDEXING_THRESHOLD_KB),
+        quantization_config=QUANTIZATION_CONFIG
     )
 
     set_tags_payload_index()
 
+    vectors = _embed_with_cache([chunk["content"] for chunk in chunks])
+
     points = [
         PointStruct(
             id=str(uuid.uuid4()),
-            vector=model.encode(chunk["content"]).tolist(),
+            vector=vector.tolist(),
             payload=chunk
         )
-        for chunk in chunks
+        for chunk, vector in zip(chunks, vectors)
     ]
 
-    client.upsert(collection_name=QDRANT_COLLECTION, points=points)
+    for start in range(0, len(points), UPSERT_BATCH_SIZE):
+        client.upsert(collection_name=QDRANT_COLLECTION, points=points[start:start + UPSERT_BATCH_SIZE])
     print(f"✅ Successfully upserted {len(points)} chunks to Qdrant.")
 
+def _embed_with_cache(contents: list[str]) -> list:
+    """
+    Embeds chunk contents for ingestion, reusing vectors from EmbeddingCache
+    for unchanged chunks and encoding only the rest.
+    """
+    keys = [EmbeddingCache.key(content) for content in contents]
+    with EmbeddingCache(EMBED_CACHE_PATH, f"{EMBED_MODEL_NAME}:{EMBED_BACKEND}") as cache:
+        vectors = cache.get_many(keys)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # All misses go to the model in one batched call
+            encoded = model.encode(
+                [contents[i] for i in missing],
+                batch_size=INGEST_BATCH_SIZE,
+                show_progress_bar=True,
+                normalize_embeddings=True,
+                convert_to_numpy=True
+            )
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+            cache.put_many((keys[i], vectors[i]) for i in missing)
+
+    print(f"♻️ Reused {len(contents) - len(missing)} cached embeddings, encoded {len(missing)}.")
+    return vectors
+
+def encode_batch(texts: list[str]) -> list[list[float]]:
+    """
+    Embeds several texts in a single model call (one batched forward pass
+    instead of one per text).
+    """
+    if not texts:
+        return []
+    return model.encode(
+        texts,
+        batch_size=EMBED_BATCH_SIZE,
+        normalize_embeddings=True,
+        convert_to_numpy=True
+    ).tolist()
+
+@lru_cache(maxsize=2048)
+def _encode_cached(text: str) -> tuple[float, ...]:
+    return tuple(model.encode(text, normalize_embeddings=True).tolist())
+
+def encode_query(text: str) -> list[float]:
+    """
+    Embeds a single query, memoized per process. The key is stripped and
+    lower-cased, which doesn't change the embedding (MiniLM's tokenizer is uncased).
+    """
+    return list(_encode_cached(text.strip().lower()))
+
+def encode_cache_info():
+    """Hit/miss statistics of the query-embedding cache."""
+    return _encode_cached.cache_info()
+
 def search_chunks(query: str, top_k: int = 5, filter_tags: list[str] = None):
-    vector = model.encode(query).tolist()
-
-    search_filter = None
-    if filter_tags:
-        search_filter = Filter(
-            should=[
-                FieldCondition(
-                    key="tags",
-                    match=MatchValue(value=tag)
-                ) for tag in filter_tags
-            ]
-        )
+    vector = encode_query(query)
+    return search_chunks_with_vector(vector, top_k=top_k, filter_tags=filter_tags)
+
+def search_chunks_with_vector(vector: list[float], top_k: int = 5, filter_tags: list[str] = None):
+    """
+    Same as search_chunks, but takes an already computed query embedding.
+    """
+    search_filter = _tags_filter(filter_tags) if filter_tags else None
 
     results = client.search(
         collection_name=QDRANT_COLLECTION,
         query_vector=vector,
         limit=top_k,
-        query_filter=search_filter
+        query_filter=search_filter,
+        search_params=SEARCH_PARAMS
     )
 
     return [hit.payload for hit in results]
 
-# ✅ NEW: Get all chunks matching tags (no vector scoring, no top_k limit)
-def get_chunks_by_tags(tags: list[str]) -> list:
+def search_chunks_scored(vector: list[float], top_k: int = 5) -> list[dict]:
+    """Semantic search keeping each hit's similarity as the payload's "score"."""
+    results = client.search(
+        collection_name=QDRANT_COLLECTION,
+        query_vector=vector,
+        limit=top_k,
+        search_params=SEARCH_PARAMS
+    )
+
+    return [{**hit.payload, "score": hit.score} for hit in results]
+
+def hybrid_search(vector: list[float], tags: list[str] = None, top_k: int = 5) -> list:
+    """
+    Semantic search plus tag-restricted semantic search in a single Qdrant
+    request. Both candidate sets are prefetched server-side and fused with
+    reciprocal rank fusion, so each point appears once. Without tags this is
+    a plain semantic search.
+    """
+    if not tags:
+        return search_chunks_with_vector(vector, top_k=top_k)
+
+    response = client.query_points(
+        collection_name=QDRANT_COLLECTION,
+        prefetch=[
+            Prefetch(query=vector, limit=top_k, params=SEARCH_PARAMS),
+            Prefetch(query=vector, filter=_tags_filter(tags), limit=top_k, params=SEARCH_PARAMS)
+        ],
+        query=FusionQuery(fusion=Fusion.RRF),
+        limit=2 * top_k,
+        with_payload=True
+    )
+
+    return [point.payload for point in response.points]
+
+def _hybrid_request(
+    vector: list[float],
+    tags: list[str] = None,
+    top_k: int = 5,
+    with_vectors: bool = False
+) -> QueryRequest:
+    """The hybrid_search query for one vector, as a batchable QueryRequest."""
+    if not tags:
+        return QueryRequest(
+            query=vector, limit=top_k, params=SEARCH_PARAMS, with_payload=True, with_vector=with_vectors
+        )
+    return QueryRequest(
+        prefetch=[
+            Prefetch(query=vector, limit=top_k, params=SEARCH_PARAMS),
+            Prefetch(query=vector, filter=_tags_filter(tags), limit=top_k, params=SEARCH_PARAMS)
+        ],
+        query=FusionQuery(fusion=Fusion.RRF),
+        limit=2 * top_k,
+        with_payload=True,
+        with_vector=with_vectors
+    )
+
+def hybrid_search_batch(
+    vectors: list[list[float]],
+    tags_list: list[list[str]],
+    top_k: int = 5,
+    with_vectors: bool = False
+) -> list[list]:
     """
-    Returns all chunks that match the given tags without top_k limit.
+    hybrid_search for several vectors in one round trip: Qdrant runs the
+    requests server-side and returns one result list per vector, in order.
+    With with_vectors=True each result is a (payload, vector) pair.
+    """
+    if not vectors:
+        return []
+
+    responses = client.query_batch_points(
+        collection_name=QDRANT_COLLECTION,
+        requests=[_hybrid_request(v, t, top_k, with_vectors) for v, t in zip(vectors, tags_list)]
+    )
+
+    if with_vectors:
+        return [[(point.payload, point.vector) for point in response.points] for response in responses]
+    return [[point.payload for point in response.points] for response in responses]
+
+def get_tagged_points(tags: list[str], limit: int = TAG_SCAN_LIMIT) -> list[tuple]:
+    """
+    Same filter-only scan as get_chunks_by_tags, but returns (payload, vector)
+    pairs so the caller can score the points against a query itself.
     """
     if not tags:
         return []
 
-    tag_filter = Filter(
-        should=[
-            FieldCondition(key="tags", match=MatchValue(value=tag))
-            for tag in tags
-        ]
+    response = client.query_points(
+        collection_name=QDRANT_COLLECTION,
+        query_filter=_tags_filter(tags),
+        with_payload=True,
+        with_vectors=True,
+        limit=limit
     )
 
-    scroll_result = client.scroll(
+    return [(point.payload, point.vector) for point in response.points]
+
+def get_chunks_by_tags(tags: list[str], limit: int = TAG_SCAN_LIMIT) -> list:
+    """
+    Returns chunks that match any of the given tags, without vector scoring.
+
+    Uses a filter-only query_points request (gRPC with prefer_grpc=True) and is
+    capped at `limit` points (LF_TAG_SCAN_LIMIT, default 1000) so a broad tag
+    can't pull the whole collection into a single request.
+    """
+    if not tags:
+        return []
+
+    response = client.query_points(
         collection_name=QDRANT_COLLECTION,
-        scroll_filter=tag_filter,
+        query_filter=_tags_filter(tags),
         with_payload=True,
         with_vectors=False,
-        limit=1000  # adjust this if needed
+        limit=limit
     )
 
-    return [point.payload for point in scroll_result[0]]
+    return [point.payload for point in response.points]
@@ -1,22 +1,103 @@
-from services import get_gemini_client
+import asyncio
+from functools import lru_cache
+from pathlib import Path
+from lf_assist.app.utils.llm import get_gemini_model
 from app_logger import logger
 
 
+@lru_cache(maxsize=8)
+def _load_prompt(path: str) -> str:
+    """Read a prompt template once per path (they don't change at runtime)."""
+    return Path(path).read_text(encoding="utf-8")
+
+
+def _parse_tag_line(line: str) -> list[str]:
+    return [tag.strip() for tag in line.replace("Tag(s):", "").split(",") if tag.strip()]
+
+
+def _single_prompt(query: str, tag_prompt_path: str) -> str:
+    return _load_prompt(tag_prompt_path).replace("{question}", query.strip())
+
+
+def _batch_prompt(queries: list[str], tag_prompt_path: str) -> str:
+    numbered = "\n".join(f"{i}. {q.strip()}" for i, q in enumerate(queries, 1))
+    return _load_prompt(tag_prompt_path).replace("{question}", numbered) + (
+        "\n\nThe query contains several numbered questions. Answer each one separately, "
+        "in order, using the format above."
+    )
+
+
+def _parse_single(response: str) -> list[str]:
+    # Look for "Tag(s):" line
+    tag_line = next((line for line in response.splitlines() if line.startswith("Tag(s):")), "")
+    if tag_line:
+        return _parse_tag_line(tag_line)
+    return []
+
+
+def _parse_batch(response: str, count: int) -> list[list[str]] | None:
+    tag_lines = [line for line in response.splitlines() if line.startswith("Tag(s):")]
+    if len(tag_lines) == count:
+        return [_parse_tag_line(line) for line in tag_lines]
+
+    logger.warning(f"Batched tagging returned {len(tag_lines)} tag lines for {count} questions, tagging individually")
+    return None
+
+
 def tag_query(query: str, tag_prompt_path: str) -> list[str]:
     try:
-        with open(tag_prompt_path, "r") as f:
-            prompt_template = f.read()
+        gemini = get_gemini_model()
+        return _parse_single(gemini.generate(_single_prompt(query, tag_prompt_path)).strip())
+    except Exception as e:
+        logger.error(f"Error tagging query: {e}")
+        return []
 
-        final_prompt = prompt_template.replace("{question}", query.strip())
 
-        gemini = get_gemini_client()
-        response = gemini.generate(final_prompt).strip()
+def tag_queries(queries: list[str], tag_prompt_path: str) -> list[list[str]]:
+    """
+    Tags several queries with a single LLM call.
 
-        # Look for "Tag(s):" line
-        tag_line = next((line for line in response.splitlines() if line.startswith("Tag(s):")), "")
-        if tag_line:
-            return [tag.strip() for tag in tag_line.replace("Tag(s):", "").split(",") if tag.strip()]
-        return []
+    The questions are numbered into one prompt and the model answers with one
+    "Question/Tag(s)" pair per question, in order. Falls back to tagging each
+    query separately if the response cannot be matched back to the questions.
+    """
+    if len(queries) <= 1:
+        return [tag_query(q, tag_prompt_path) for q in queries]
+
+    try:
+        gemini = get_gemini_model()
+        tags = _parse_batch(gemini.generate(_batch_prompt(queries, tag_prompt_path)).strip(), len(queries))
+        if tags is not None:
+            return tags
+    except Exception as e:
+        logger.error(f"Error batch tagging queries: {e}")
+
+    return [tag_query(q, tag_prompt_path) for q in queries]
+
+
+async def atag_query(query: str, tag_prompt_path: str) -> list[str]:
+    """Async variant of tag_query on the shared client's async transport."""
+    try:
+        gemini = get_gemini_model()
+        return _parse_single((await gemini.generate_async(_single_prompt(query, tag_prompt_path))).strip())
     except Exception as e:
         logger.error(f"Error tagging query: {e}")
         return []
+
+
+async def atag_queries(queries: list[str], tag_prompt_path: str) -> list[list[str]]:
+    """
+    Async variant of tag_queries. Awaits the Gemini call instead of holding a
+    worker thread, and the per-question fallback runs concurrently.
+    """
+    if len(queries) > 1:
+        try:
+            gemini = get_gemini_model()
+            response = await gemini.generate_async(_batch_prompt(queries, tag_prompt_path))
+            tags = _parse_batch(response.strip(), len(queries))
+            if tags is not None:
+                return tags
+        except Exception as e:
+            logger.error(f"Error batch tagging queries: {e}")
+
+    return list(await asyncio.gather(*(atag_query(q, tag_prompt_path) for q in queries)))
@@ -1,32 +1,55 @@
 # app/retriever.py
+import asyncio
+import os
+import numpy as np
+import xxhash
+from concurrent.futures import ThreadPoolExecutor
+from heapq import nlargest
+from operator import itemgetter
 from typing import List, Dict, Any, Optional
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-from lf_assist.app.qdrant_store import search_chunks, get_chunks_by_tags
+from lf_assist.app.qdrant_store import (
+    encode_query, encode_batch, hybrid_search, hybrid_search_batch, get_chunks_by_tags,
+    search_chunks_scored, get_tagged_points
+)
 from app_logger import logger
 
+# Results per search type. Chunks arrive ranked and are deduplicated in order,
+# so a small top_k keeps the best context while bounding the summarizer prompt
+DEFAULT_TOP_K = int(os.getenv("LF_RETRIEVAL_TOP_K", "20"))
 
-def get_relevant_chunks(
-    query: str, 
-    tags: list[str] = None, 
-    chat_history: Optional[Dict[str, Any]] = None, 
-    top_k: int = 100
-) -> list[str]:
+# Queries shorter than this carry no usable semantics (e.g. "?" or a bare tag
+# echo); when tags are known they are answered from the tag filter alone
+MIN_SEMANTIC_QUERY_CHARS = 3
+
+# Maximal Marginal Relevance: when LF_MMR_TOP_K > 0, each sub-question's
+# candidates are reranked for relevance *and* diversity and cut to that many
+# chunks, so near-duplicate chunks don't spend prompt tokens. Off by default.
+MMR_TOP_K = int(os.getenv("LF_MMR_TOP_K", "0"))
+MMR_LAMBDA = float(os.getenv("LF_MMR_LAMBDA", "0.7"))
+
+# Workers for issuing independent Qdrant searches concurrently
+_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lf-retriever")
+
+
+def _is_tag_only(query: str, tags: Optional[list[str]]) -> bool:
+    """True when the query is too short to embed meaningfully but tags are available."""
+    return bool(tags) and len(query.strip()) < MIN_SEMANTIC_QUERY_CHARS
+
+
+def build_search_query(query: str, chat_history: Optional[Dict[str, Any]] = None) -> str:
     """
-    Retrieve relevant document chunks from Qdrant using both semantic query search
-    and optional tag filtering. Falls back to query-only search if tags return no matches.
+    Build the text used for semantic search: the query, prefixed with the last
+    user/bot exchange so vague follow-ups still retrieve the right chunks.
 
     Args:
         query (str): The user query.
-        tags (list[str], optional): List of tags to filter search. Defaults to None.
         chat_history (dict, optional): Dictionary containing conversation history.
                                       Format: {"chat_history": [messages], "history": "formatted string"}
-        top_k (int): Number of top results to retrieve per search type.
 
     Returns:
-        list[str]: A list of relevant chunk contents.
+        str: The search text to embed.
     """
-
-    # 1️⃣ Optional: Include recent conversation history for vague follow-ups
     if chat_history and chat_history.get("chat_history"):
         messages = chat_history["chat_history"]
         
@@ -40,43 +63,171 @@ def get_relevant_chunks(
                 history_text_parts.append(msg.content)
         
         history_text = " ".join(history_text_parts)
-        search_query = f"{history_text} {query}"
-        logger.debug(f"Using conversation context: {history_text[:100]}...")
-    else:
-        search_query = query
+        logger.debug("Using conversation context: %.100s...", history_text)
+        return f"{history_text} {query}"
+    return query
 
-    logger.debug(f"Running semantic search for query: '{search_query}'")
 
-    # 2️⃣ Always do semantic search based on the query
-    query_results = search_chunks(search_query, top_k=top_k)
-    logger.debug(f"Semantic search returned {len(query_results)} results")
+def get_relevant_chunks(
+    query: str, 
+    tags: list[str] = None, 
+    chat_history: Optional[Dict[str, Any]] = None, 
+    top_k: int = DEFAULT_TOP_K,
+    query_vector: Optional[list[float]] = None
+) -> list[str]:
+    """
+    Retrieve relevant document chunks from Qdrant using both semantic query search
+    and optional tag filtering (see qdrant_store.hybrid_search).
 
-    # 3️⃣ Tag-based search (if tags provided)
-    tag_results = []
+    Args:
+        query (str): The user query.
+        tags (list[str], optional): List of tags to filter search. Defaults to None.
+        chat_history (dict, optional): Dictionary containing conversation history.
+                                      Format: {"chat_history": [messages], "history": "formatted string"}
+        top_k (int): Number of top results to retrieve per search type.
+        query_vector (list[float], optional): Precomputed embedding of the search query
+                                              (see build_search_query). Skips re-encoding.
+
+    Returns:
+        list[str]: A list of relevant chunk contents.
+    """
+
+    # Trivial query with tags: skip the embedding and the ANN search
+    if _is_tag_only(query, tags):
+        logger.debug("Query too short for semantic search, using tags only: %s", tags)
+        return [r["content"] for r in get_chunks_by_tags(tags, limit=2 * top_k)]
+
+    # 1️⃣ Optional: Include recent conversation history for vague follow-ups
+    search_query = build_search_query(query, chat_history)
+
+    logger.debug("Running semantic search for query: '%s'", search_query)
+
+    # 2️⃣ Semantic search, plus tag-restricted semantic search when tags are given,
+    #    fused server-side in one round trip (points come back unique)
+    if query_vector is None:
+        query_vector = encode_query(search_query)
     if tags:
-        logger.debug(f"Running tag search for tags: {tags}")
-        tag_results = get_chunks_by_tags(tags)
-        logger.debug(f"Tag search returned {len(tag_results)} results")
+        logger.debug("Running hybrid search for tags: %s", tags)
     else:
         logger.debug("No tags provided for tag search")
+    results = hybrid_search(query_vector, tags, top_k=top_k)
 
-    # 4️⃣ Merge and deduplicate results
-    seen = set()
-    merged_results = []
+    merged_results = [r["content"] for r in results]
 
-    for result in query_results + tag_results:
-        content = result.get("content") if isinstance(result, dict) else result
-        if content not in seen:
-            seen.add(content)
-            merged_results.append(content)
+    logger.debug("Final merged results: %d chunks", len(merged_results))
+    return merged_results
 
-    # 5️⃣ Fallback: if no merged results, return query-only results
-    if not merged_results:
-        logger.warning("No merged results, falling back to query-only results")
-        merged_results = [r["content"] for r in query_results]
 
-    logger.debug(f"Final merged results: {len(merged_results)} chunks")
-    return merged_results
+async def aget_relevant_chunks(
+    query: str, 
+    tags: list[str] = None, 
+    chat_history: Optional[Dict[str, Any]] = None, 
+    top_k: int = DEFAULT_TOP_K,
+    query_vector: Optional[list[float]] = None
+) -> list[str]:
+    """
+    Async variant of get_relevant_chunks. The Qdrant/embedding clients are
+    blocking, so the work runs in a worker thread to keep the event loop free.
+    """
+    return await asyncio.to_thread(
+        get_relevant_chunks, query, tags, chat_history, top_k, query_vector
+    )
+
+
+def mmr_select(
+    query_vector: list[float],
+    candidates: list[tuple],
+    k: int,
+    lambda_: float = MMR_LAMBDA
+) -> list[dict]:
+    """
+    Pick k of the (payload, vector) candidates by Maximal Marginal Relevance:
+    each step takes the candidate maximizing
+    lambda * sim(query, d) - (1 - lambda) * max(sim(d, s) for s already selected).
+    Vectors are unit-length, so dot products are cosine similarities.
+    Returns the selected payloads in selection order.
+    """
+    if len(candidates) <= k:
+        return [payload for payload, _ in candidates]
+
+    docs = np.asarray([vector for _, vector in candidates], dtype=np.float32)
+    relevance = docs @ np.asarray(query_vector, dtype=np.float32)
+
+    first = int(np.argmax(relevance))
+    selected = [first]
+    # Running max similarity of every candidate to the selected set
+    redundancy = docs @ docs[first]
+    for _ in range(k - 1):
+        scores = lambda_ * relevance - (1 - lambda_) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(redundancy, docs @ docs[best], out=redundancy)
+
+    return [candidates[i][0] for i in selected]
+
+
+def get_relevant_chunks_batch(
+    queries: list[str],
+    tags_list: list[list[str]],
+    chat_history: Optional[Dict[str, Any]] = None,
+    top_k: int = DEFAULT_TOP_K,
+    query_vectors: Optional[list[list[float]]] = None
+) -> list[list[str]]:
+    """
+    get_relevant_chunks for several (sub-)questions with a single batched
+    Qdrant request. Returns one list of chunk contents per query, in order.
+    """
+    results: list = [None] * len(queries)
+    # Trivial queries with tags are answered from the tag filter alone
+    semantic = []
+    for i, (q, tags) in enumerate(zip(queries, tags_list)):
+        if _is_tag_only(q, tags):
+            results[i] = get_chunks_by_tags(tags, limit=2 * top_k)
+        else:
+            semantic.append(i)
+
+    if semantic:
+        if query_vectors is None:
+            vectors = encode_batch([build_search_query(queries[i], chat_history) for i in semantic])
+        else:
+            vectors = [query_vectors[i] for i in semantic]
+        use_mmr = MMR_TOP_K > 0
+        batch = hybrid_search_batch(
+            vectors, [tags_list[i] for i in semantic], top_k=top_k, with_vectors=use_mmr
+        )
+        for i, vector, chunks in zip(semantic, vectors, batch):
+            results[i] = mmr_select(vector, chunks, MMR_TOP_K) if use_mmr else chunks
+
+    for q, chunks in zip(queries, results):
+        logger.debug("Retrieved %d chunks for '%s'", len(chunks), q)
+
+    return [[r["content"] for r in chunks] for chunks in results]
+
+
+async def aget_relevant_chunks_batch(
+    queries: list[str],
+    tags_list: list[list[str]],
+    chat_history: Optional[Dict[str, Any]] = None,
+    top_k: int = DEFAULT_TOP_K,
+    query_vectors: Optional[list[list[float]]] = None
+) -> list[list[str]]:
+    """Async variant of get_relevant_chunks_batch (runs in a worker thread)."""
+    return await asyncio.to_thread(
+        get_relevant_chunks_batch, queries, tags_list, chat_history, top_k, query_vectors
+    )
+
+
+def _score_points(query_vector: list[float], points: list[tuple]) -> list[dict]:
+    """
+    Score (payload, vector) pairs from the tag filter against the query with
+    one matrix-vector product. Vectors are unit-length, so this is cosine.
+    """
+    if not points:
+        return []
+    matrix = np.asarray([vector for _, vector in points], dtype=np.float32)
+    sims = matrix @ np.asarray(query_vector, dtype=np.float32)
+    return [{**payload, "score": float(sim)} for (payload, _), sim in zip(points, sims.tolist())]
 
 
 def get_relevant_chunks_with_scores(
@@ -95,40 +246,49 @@ def get_relevant_chunks_with_scores(
         top_k (int): Number of top results to retrieve per search type.
 
     Returns:
-        list[dict]: List of dicts with 'content' and 'score' keys.
+        list[dict]: Up to top_k dicts with 'content' and 'score' keys, highest score first.
     """
 
     # Include conversation context if available
-    if chat_history and chat_history.get("chat_history"):
-        messages = chat_history["chat_history"]
-        recent_messages = messages[-2:] if len(messages) >= 2 else messages
-        
-        history_text_parts = []
-        for msg in recent_messages:
-            if isinstance(msg, (HumanMessage, AIMessage)):
-                history_text_parts.append(msg.content)
-        
-        history_text = " ".join(history_text_parts)
-        search_query = f"{history_text} {query}"
-    else:
-        search_query = query
+    search_query = build_search_query(query, chat_history)
 
-    print(f"\n🔍 Running semantic search with scores for query: '{search_query}'")
+    # Semantic and tag-based searches are independent Qdrant calls, so run
+    # them concurrently: wall time is the slower of the two, not the sum.
+    # A trivial query with tags skips the semantic search altogether.
+    query_vector = None
+    query_future = None
+    if not _is_tag_only(query, tags):
+        logger.debug("Running semantic search with scores for query: '%s'", search_query)
+        query_vector = encode_query(search_query)
+        query_future = _POOL.submit(search_chunks_scored, query_vector, top_k)
+    tag_future = None
+    if tags:
+        logger.debug("Running tag search for tags: %s", tags)
+        if query_vector is None:
+            tag_future = _POOL.submit(get_chunks_by_tags, tags)
+        else:
+            tag_future = _POOL.submit(get_tagged_points, tags)
 
-    # Semantic search
-    query_results = search_chunks(search_query, top_k=top_k)
-    print(f"   📄 Semantic search returned {len(query_results)} results")
+    query_results = []
+    if query_future is not None:
+        query_results = query_future.result()
+        logger.debug("Semantic search returned %d results", len(query_results))
 
-    # Tag-based search
     tag_results = []
-    if tags:
-        print(f"🏷️ Running tag search for tags: {tags}")
-        tag_results = get_chunks_by_tags(tags)
-        print(f"   📄 Tag search returned {len(tag_results)} results")
+    if tag_future is not None:
+        tag_results = tag_future.result()
+        if query_vector is not None:
+            tag_results = _score_points(query_vector, tag_results)
+        logger.debug("Tag search returned %d results", len(tag_results))
 
-    # Merge with scores
-    seen = set()
+    # Merge with scores, deduplicating on an 8-byte hash of each chunk
+    # rather than keeping (and re-hashing) the full chunk strings
+    seen: set[int] = set()
     merged_results = []
+    # Bound methods hoisted out of the loop (local loads instead of attribute lookups)
+    add_seen = seen.add
+    append = merged_results.append
+    digest = xxhash.xxh3_64_intdigest
 
     for result in query_results + tag_results:
         if isinstance(result, dict):
@@ -138,15 +298,17 @@ def get_relevant_chunks_with_scores(
             content = result
             score = 0.0
         
-        if content not in seen:
-            seen.add(content)
-            merged_results.append({
-                "content": content,
-                "score": score
-            })
+        h = digest(content)
+        if h in seen:
+            continue
+        add_seen(h)
+        append({
+            "content": content,
+            "score": score
+        })
 
-    # Sort by score (highest first)
-    merged_results.sort(key=lambda x: x["score"], reverse=True)
+    # Keep the top_k highest-scoring (O(N log k), C-level key function)
+    merged_results = nlargest(top_k, merged_results, key=itemgetter("score"))
 
-    print(f"✅ Final merged results: {len(merged_results)} chunks with scores\n")
+    logger.debug("Final merged results: %d chunks with scores", len(merged_results))
     return merged_results
@@ -0,0 +1,168 @@
+"""
+Qdrant-backed semantic response cache for LF Assist.
+
+Stores (query embedding -> answer) pairs in a dedicated Qdrant collection so
+near-duplicate questions skip tagging, retrieval and summarization. Unlike the
+in-process services.SemanticCache, entries survive restarts and are shared by
+every worker pointing at the same Qdrant instance.
+
+Only standalone questions (no conversation history) are cached, in one scope
+shared by every session: their answer depends on the question alone. A hit
+also requires the same question literals, so "What is the fee for Plan A?"
+never serves the answer about Plan B. Entries expire after SEMANTIC_CACHE_TTL
+seconds; expired points are deleted from the collection by add(), at most once
+per PRUNE_INTERVAL_SECONDS.
+"""
+
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from qdrant_client.http.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    Filter,
+    FieldCondition,
+    FilterSelector,
+    MatchValue,
+    PayloadSchemaType,
+    Range
+)
+
+from lf_assist.app.qdrant_store import client, encode_query
+from services.semantic_cache import DEFAULT_THRESHOLD, DEFAULT_TTL_SECONDS, question_literals
+from app_logger import logger
+
+CACHE_COLLECTION = os.getenv("LF_RESPONSE_CACHE_COLLECTION", "lf_assist_response_cache")
+VECTOR_SIZE = 384
+PRUNE_INTERVAL_SECONDS = 600
+# Scope of answers to standalone questions, shared by every session
+SHARED_SCOPE = "shared"
+
+
+def _literals_key(question: str) -> str:
+    """question_literals as one exact-match payload value."""
+    return "\x1f".join(question_literals(question))
+
+
+class SemanticCache:
+    """
+    Semantic cache of LF Assist answers in a Qdrant collection (384-dim unit vectors, dot product).
+
+    Args:
+        threshold: Minimum cosine similarity for a hit.
+        ttl_seconds: Maximum age of an entry before it is ignored.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        collection_name: str = CACHE_COLLECTION,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.collection_name = collection_name
+        self._ready = False
+        self._last_prune = 0.0
+
+    def _ensure_collection(self) -> None:
+        """Create the cache collection and its payload indexes on first use."""
+        if self._ready:
+            return
+        if not client.collection_exists(self.collection_name):
+            client.create_collection(
+                collection_name=self.collection_name,
+                # encode_query returns unit vectors: dot product == cosine
+                vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.DOT)
+            )
+            client.create_payload_index(self.collection_name, "scope", PayloadSchemaType.KEYWORD)
+            client.create_payload_index(self.collection_name, "literals", PayloadSchemaType.KEYWORD)
+            client.create_payload_index(self.collection_name, "ts", PayloadSchemaType.FLOAT)
+            logger.info(f"Created semantic cache collection: {self.collection_name}")
+        self._ready = True
+
+    def embed(self, text: str) -> list[float]:
+        """Embed a question with the retrieval model."""
+        return encode_query(text)
+
+    def lookup(self, scope: str, question: str, vector: list[float]) -> Optional[Dict[str, Any]]:
+        """Return the cached {"tags", "answer"} for the closest fresh question with the same literals, or None."""
+        self._ensure_collection()
+
+        hits = client.query_points(
+            collection_name=self.collection_name,
+            query=vector,
+            query_filter=Filter(must=[
+                FieldCondition(key="scope", match=MatchValue(value=scope)),
+                FieldCondition(key="literals", match=MatchValue(value=_literals_key(question))),
+                FieldCondition(key="ts", range=Range(gte=time.time() - self.ttl_seconds)),
+            ]),
+            limit=1,
+            with_payload=True
+        ).points
+        if not hits or hits[0].score < self.threshold:
+            best = hits[0].score if hits else 0.0
+            logger.debug(f"Semantic cache miss (scope={scope}, best score={best:.4f})")
+            return None
+
+        logger.debug(f"Semantic cache hit (scope={scope}, score={hits[0].score:.4f})")
+        payload = hits[0].payload
+        return {"tags": payload.get("tags", []), "answer": payload["answer"]}
+
+    def add(self, scope: str, question: str, vector: list[float], response: Dict[str, Any]) -> None:
+        """Store an answer; failures are logged and never break the request."""
+        try:
+            self._ensure_collection()
+            client.upsert(
+                collection_name=self.collection_name,
+                points=[PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector=vector,
+                    payload={
+                        "scope": scope,
+                        "literals": _literals_key(question),
+                        "ts": time.time(),
+                        "tags": response.get("tags", []),
+                        "answer": response["answer"],
+                    }
+                )],
+                wait=False
+            )
+            self._prune_expired()
+        except Exception as e:
+            logger.warning(f"Failed to write semantic cache entry: {e}")
+
+    def _prune_expired(self) -> None:
+        """Delete points older than the TTL (lookups already ignore them)."""
+        now = time.time()
+        if now - self._last_prune < PRUNE_INTERVAL_SECONDS:
+            return
+        self._last_prune = now
+        client.delete(
+            collection_name=self.collection_name,
+            points_selector=FilterSelector(filter=Filter(must=[
+                FieldCondition(key="ts", range=Range(lt=now - self.ttl_seconds))
+            ])),
+            wait=False
+        )
+
+    def clear(self, scope: Optional[str] = None) -> None:
+        """Drop cached entries for `scope`, or the whole cache if None."""
+        try:
+            if scope is None:
+                client.delete_collection(self.collection_name)
+                self._ready = False
+                return
+            self._ensure_collection()
+            client.delete(
+                collection_name=self.collection_name,
+                points_selector=FilterSelector(filter=Filter(must=[
+                    FieldCondition(key="scope", match=MatchValue(value=scope))
+                ])),
+                wait=False
+            )
+        except Exception as e:
+            logger.warning(f"Failed to clear semantic cache: {e}")
@@ -1,17 +1,17 @@
+import io
 import re
 import os
-from typing import Optional, Dict, Any, List
-from dotenv import load_dotenv
+from typing import Optional, Dict, Any, AsyncIterator, Iterator, List
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-from services import get_gemini_client
-
-
-load_dotenv()
+from lf_assist.app.utils.llm import get_gemini_model
+from app_logger import logger
 
 
 # Get centralized Gemini client
-gemini = get_gemini_client()
-# genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+gemini = get_gemini_model()
+
+_BOLD_RE = re.compile(r'\*\*(.*?)\*\*')
+_BULLET_RE = re.compile(r'^\* ', re.MULTILINE)
 
 
 def clean_markdown(text: str) -> str:
@@ -20,9 +20,16 @@ def clean_markdown(text: str) -> str:
     - Remove **bold**
     - Convert * bullets to hyphens
     """
-    text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)  # remove bold
-    text = re.sub(r'^\* ', '- ', text, flags=re.MULTILINE)  # convert bullets to dashes
-    return text.strip()
+    return _clean_lines(text).strip()
+
+
+def _clean_lines(text: str) -> str:
+    """clean_markdown without the final strip (safe to apply to whole-line fragments)."""
+    text = _BOLD_RE.sub(r'\1', text)  # remove bold
+    return _BULLET_RE.sub('- ', text)  # convert bullets to dashes
+
+
+_ROLE_MAP = {HumanMessage: "User", AIMessage: "Bot"}
 
 
 def format_conversation_history(messages: List[BaseMessage], max_messages: int = 6) -> str:
@@ -36,52 +43,25 @@ def format_conversation_history(messages: List[BaseMessage], max_messages: int =
     Returns:
         Formatted conversation history string
     """
-    if not messages:
-        return ""
-    
-    # Get last N messages
-    recent_messages = messages[-max_messages:] if len(messages) > max_messages else messages
-    
-    history_lines = []
-    for msg in recent_messages:
-        if isinstance(msg, HumanMessage):
-            history_lines.append(f"User: {msg.content}")
-        elif isinstance(msg, AIMessage):
-            history_lines.append(f"Bot: {msg.content}")
-    
-    return "\n".join(history_lines)
+    # Last N messages (slicing past the start is safe); other roles are skipped
+    return "\n".join(
+        f"{_ROLE_MAP[type(msg)]}: {msg.content}"
+        for msg in messages[-max_messages:]
+        if type(msg) in _ROLE_MAP
+    )
 
 
-def summarize(query: str, chunks: list, chat_history: Optional[Dict[str, Any]] = None) -> str:
-    """
-    Summarizes an answer to the user's query using retrieved context and conversation history.
-    Falls back to conversation history alone if no relevant chunks are found.
-    
-    Args:
-        query (str): The user's question
-        chunks (list): List of retrieved document chunks (list of dicts with 'content' key)
-        chat_history (dict, optional): Dictionary containing conversation history
-                                      Format: {"chat_history": [messages], "history": "formatted string"}
-    
-    Returns:
-        str: The generated answer
-    """
+UNABLE_TO_ANSWER = "I'm unable to answer your query. Kindly reach out to customer support."
 
-    # Build conversation history from chat_history
-    conversation_history = ""
-    if chat_history:
-        # Try to use pre-formatted history first
-        if "history" in chat_history and chat_history["history"]:
-            conversation_history = chat_history["history"]
-        # Otherwise format from messages
-        elif "chat_history" in chat_history and chat_history["chat_history"]:
-            messages = chat_history["chat_history"]
-            conversation_history = format_conversation_history(messages, max_messages=6)
 
-    # If no chunks, try to answer from conversation history alone
-    if not chunks:
-        if conversation_history.strip():
-            fallback_prompt = f"""
+class _SafeDict(dict):
+    """format_map mapping that leaves unknown {placeholders} in place."""
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+# Prompt templates, built once at import and rendered with format_map
+_FALLBACK_TMPL = """
 You are an LMS support assistant.
 
 Conversation history:
@@ -94,16 +74,8 @@ Answer the question based only on the conversation history above.
 If you cannot find the answer there, reply with:
 "I'm unable to answer your query. Kindly reach out to customer support."
 """
-            response = gemini.generate(fallback_prompt)
-            return clean_markdown(response)
 
-        return "I'm unable to answer your query. Kindly reach out to customer support."
-
-    # Join retrieved chunks into context string
-    context = "\n\n".join(f"- {c['content']}" for c in chunks)
-
-    # Main prompt combining manual + history
-    prompt = f"""
+_PROMPT_TMPL = """
 # Personality
 
 You are an AI assistant specializing in customer support for a Loan Managing Software (LMS). You are friendly, proactive, and highly intelligent with a world-class customer support background. 
@@ -172,15 +144,162 @@ Please provide only the answer to user query in the response no additional comme
 Remember, only use information from the provided context and conversation history to answer the question.
 """.strip()
 
-    # Generate response from Gemini
-    response = gemini.generate(prompt)
-    return clean_markdown(response)
+# The main template around {context}; the head has no other placeholders
+_PROMPT_HEAD, _PROMPT_TAIL = _PROMPT_TMPL.split("{context}", 1)
+
+
+def _extract_history(history_source: Any) -> str:
+    """
+    Return the formatted conversation history from any of the history shapes
+    callers pass around: the chat_history dict ({"history": str} and/or
+    {"chat_history": [messages]}), a LangChain memory object, or a plain list
+    of messages.
+    """
+    if not history_source:
+        return ""
+    if isinstance(history_source, dict):
+        # Prefer the pre-formatted history, otherwise format from messages
+        if history_source.get("history"):
+            return history_source["history"]
+        messages = history_source.get("chat_history")
+    elif hasattr(history_source, "chat_memory"):
+        messages = history_source.chat_memory.messages
+    else:
+        messages = history_source
+    return format_conversation_history(list(messages), max_messages=6) if messages else ""
+
+
+def _build_prompt(query: str, chunks: list, conversation_history: str) -> Optional[str]:
+    """
+    Build the summarization prompt. Returns None when there is nothing to answer
+    from (no chunks and no history), in which case UNABLE_TO_ANSWER is the reply.
+    """
+    # If no chunks, try to answer from conversation history alone
+    if not chunks:
+        if conversation_history.strip():
+            return _FALLBACK_TMPL.format_map(_SafeDict(conversation_history=conversation_history, query=query))
+        return None
+
+    # Main prompt combining manual + history. Chunk contents are written
+    # straight into the buffer instead of joining a separate context string.
+    buf = io.StringIO()
+    buf.write(_PROMPT_HEAD)
+    for i, c in enumerate(chunks):
+        buf.write("\n\n- " if i else "- ")
+        buf.write(c["content"])
+    buf.write(_PROMPT_TAIL.format_map(_SafeDict(conversation_history=conversation_history, query=query)))
+    return buf.getvalue()
+
+
+class _StreamCleaner:
+    """
+    Applies clean_markdown to a text stream. Text is released one completed
+    line at a time so the bold and bullet rewrites (which are line-local)
+    apply exactly as on the whole answer, and leading/trailing whitespace is
+    held back so the joined output equals clean_markdown(full_text).
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pending = ""
+        self._started = False
+
+    def feed(self, text: str) -> str:
+        self._buffer += text
+        if "\n" not in self._buffer:
+            return ""
+        complete, self._buffer = self._buffer.rsplit("\n", 1)
+        return self._emit(_clean_lines(complete + "\n"))
+
+    def finish(self) -> str:
+        # Trailing whitespace still pending is dropped, as strip() would
+        return self._emit(_clean_lines(self._buffer))
+
+    def _emit(self, cleaned: str) -> str:
+        if not self._started:
+            cleaned = cleaned.lstrip()
+            self._started = bool(cleaned)
+        body = cleaned.rstrip()
+        if not body:
+            self._pending += cleaned
+            return ""
+        out = self._pending + body
+        self._pending = cleaned[len(body):]
+        return out
+
+
+def summarize(
+    query: str,
+    chunks: list,
+    chat_history: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Summarizes an answer to the user's query using retrieved context and conversation history.
+    Falls back to conversation history alone if no relevant chunks are found.
+    
+    Args:
+        query (str): The user's question
+        chunks (list): List of retrieved document chunks (list of dicts with 'content' key)
+        chat_history (dict, optional): Dictionary containing conversation history
+                                      Format: {"chat_history": [messages], "history": "formatted string"}
+    
+    Returns:
+        str: The generated answer
+    """
+    return "".join(summarize_stream(query, chunks, chat_history))
+
+
+def summarize_stream(
+    query: str,
+    chunks: list,
+    chat_history: Optional[Dict[str, Any]] = None
+) -> Iterator[str]:
+    """
+    Streaming variant of summarize: yields the cleaned answer as Gemini
+    produces it. Joined, the pieces equal summarize's answer.
+    """
+    conversation_history = _extract_history(chat_history)
+    prompt = _build_prompt(query, chunks, conversation_history)
+    if prompt is None:
+        yield UNABLE_TO_ANSWER
+        return
+
+    cleaner = _StreamCleaner()
+    for text in gemini.generate_stream(prompt):
+        part = cleaner.feed(text)
+        if part:
+            yield part
+    part = cleaner.finish()
+    if part:
+        yield part
+
+
+async def asummarize_stream(
+    query: str,
+    chunks: list,
+    chat_history: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[str]:
+    """Async variant of summarize_stream (streams from the Gemini async client)."""
+    conversation_history = _extract_history(chat_history)
+    prompt = _build_prompt(query, chunks, conversation_history)
+    if prompt is None:
+        yield UNABLE_TO_ANSWER
+        return
+
+    cleaner = _StreamCleaner()
+    async for text in gemini.generate_stream_async(prompt):
+        part = cleaner.feed(text)
+        if part:
+            yield part
+    part = cleaner.finish()
+    if part:
+        yield part
 
 
 def summarize_with_safety(
     query: str, 
     chunks: list, 
-    chat_history: Optional[Dict[str, Any]] = None,
+    chat_history: Optional[Any] = None,
     generation_config: Optional[dict] = None
 ) -> Dict[str, Any]:
     """
@@ -189,7 +308,7 @@ def summarize_with_safety(
     Args:
         query (str): The user's question
         chunks (list): List of retrieved document chunks
-        chat_history (dict, optional): Dictionary containing conversation history
+        chat_history (optional): Conversation history dict, LangChain memory or message list
         generation_config (dict, optional): Custom generation config for Gemini
     
     Returns:
@@ -205,127 +324,31 @@ def summarize_with_safety(
                 "max_output_tokens": 1024,
             }
         
-        # Build conversation history
-        conversation_history = ""
-        if chat_history:
-            if "history" in chat_history and chat_history["history"]:
-                conversation_history = chat_history["history"]
-            elif "chat_history" in chat_history and chat_history["chat_history"]:
-                messages = chat_history["chat_history"]
-                conversation_history = format_conversation_history(messages, max_messages=6)
-
-        # Handle no chunks case
-        if not chunks:
-            if conversation_history.strip():
-                fallback_prompt = f"""
-You are an LMS support assistant.
-
-Conversation history:
-{conversation_history}
-
-User's new question:
-{query}
-
-Answer the question based only on the conversation history above. 
-If you cannot find the answer there, reply with:
-"I'm unable to answer your query. Kindly reach out to customer support."
-"""
-                response = gemini.generate(fallback_prompt)
-                return {
-                    "success": True,
-                    "answer": clean_markdown(response),
-                    "source": "conversation_history"
-                }
-
+        prompt = _build_prompt(query, chunks, _extract_history(chat_history))
+        if prompt is None:
             return {
                 "success": True,
-                "answer": "I'm unable to answer your query. Kindly reach out to customer support.",
+                "answer": UNABLE_TO_ANSWER,
                 "source": "fallback"
             }
 
-        # Main generation with context
-        context = "\n\n".join(f"- {c['content']}" for c in chunks)
-        
-        prompt = f"""
-# Personality
-
-You are an AI assistant specializing in customer support for a Loan Managing Software (LMS). You are friendly, proactive, and highly intelligent with a world-class customer support background. 
-
-Your approach is warm and relaxed, effortlessly balancing professionalism and approachability. You're naturally curious, empathetic, and intuitive, always aiming to deeply understand the user's intent by actively listening and thoughtfully referring back to details they've previously shared.
-
-You're highly self-aware, reflective, and comfortable acknowledging your own fallibility, which allows you to help users gain clarity in a thoughtful yet approachable manner.
-
-You're attentive and adaptive, matching the user's tone and mood—friendly, curious, respectful—without overstepping boundaries.
-
-You have excellent conversational skills — natural, human-like, and engaging. 
-
-# Environment
-
-You have expert-level familiarity with all Lendfoundry's LMS offerings.
-
-The user is seeking guidance, clarification, or assistance with navigating or implementing Lendfoundry LMS.
-
-You are interacting with a user who has initiated a spoken conversation directly from the LMS portal. 
-
-# Tone
-
-Early in conversations, subtly assess the user's knowledge of LMS and tailor your language accordingly.
-
-Express genuine empathy for any challenges they face, demonstrating your commitment to their success.
-
-Gracefully acknowledge your limitations or knowledge gaps when they arise but always being confident. Focus on building trust, providing reassurance, and ensuring your explanations resonate with users.
-
-Anticipate potential follow-up questions and address them proactively, offering practical tips and best practices to help users avoid common pitfalls.
-
-Your responses should be thoughtful, concise, and conversational—typically three sentences or fewer unless detailed explanation is necessary. 
-
-Actively reflect on previous interactions, referencing conversation history to build rapport, demonstrate attentive listening, and prevent redundancy. 
-
-# GOAL
-
-Your knowledge is based entirely on the following LMS user manual:
-
-text>
-{context}
-</context>
-
-You also have access to the conversation history:
-versation_history>
-{conversation_history}
-</conversation_history>
-
-Your task is to answer user questions about the LMS using only the information provided in the context and the conversation history above. Do not use any external knowledge or make assumptions beyond what is explicitly stated in the context.
-
-When a user asks a question, follow these steps:
-1. Analyze the question to determine its relevance to the LMS.
-2. If relevant, search the LMS manual and conversation history for information related to the question.
-3. Formulate an answer based solely on the information found in these sources.
-4. Review your answer to ensure it is accurate, complete, and directly addresses the user's question.
-5. Provide only the final answer in your response, without additional comments.
-If the question is relevant but you cannot find the necessary information in the provided sources, provide the best possible answer based on the available context. If no relevant information is found, state that you cannot find the information in the manual.
-
-Here is the user's question:
-
-<question>
-{query}
-</question>
-
-Please provide only the answer to user query in the response no additional comments are required.
-
-Remember, only use information from the provided context and conversation history to answer the question.
-""".strip()
-
-        response = gemini.generate(prompt)
+        answer = clean_markdown(gemini.generate(prompt))
+        if not chunks:
+            return {
+                "success": True,
+                "answer": answer,
+                "source": "conversation_history"
+            }
         
         return {
             "success": True,
-            "answer": clean_markdown(response),
+            "answer": answer,
             "source": "context",
             "chunks_used": len(chunks)
         }
         
     except Exception as e:
-        print(f"❌ Summarization error: {str(e)}")
+        logger.error(f"Summarization error: {e}")
         return {
             "success": False,
             "answer": "I encountered an error while generating the response. Please try again.",
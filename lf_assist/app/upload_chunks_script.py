@@ -6,13 +6,15 @@ import json
 pdf_path = "data/New_LMS_Manual_Chatbot.pdf"
 json_path = "data/lms_chunks.json"
 
-# Step 1: Extract from PDF and save as JSON
-if not os.path.exists(json_path):
-    chunks = load_chunks(pdf_path)
-    save_chunks_to_json(chunks, json_path)
-else:
-    with open(json_path, "r", encoding="utf-8") as f:
-        chunks = json.load(f)
+# Guarded: large PDFs are extracted in worker processes, which re-import this module
+if __name__ == "__main__":
+    # Step 1: Extract from PDF and save as JSON
+    if not os.path.exists(json_path):
+        chunks = load_chunks(pdf_path)
+        save_chunks_to_json(chunks, json_path)
+    else:
+        with open(json_path, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
 
-# Step 2: Upload to Qdrant
-upsert_chunks(chunks)
+    # Step 2: Upload to Qdrant
+    upsert_chunks(chunks)
@@ -1,9 +1,16 @@
 # app/utils/llm.py
-from services import get_langchain_llm
+from functools import lru_cache
+from services import get_gemini_client, get_langchain_llm
 
-# Get the singleton LangChain LLM instance
-llm = get_langchain_llm()
+
+@lru_cache(maxsize=1)
+def get_gemini_model():
+    """
+    The process-wide Gemini client, created on first use (after .env has been
+    loaded) and shared by every LF Assist module.
+    """
+    return get_gemini_client()
 
 
 def call_gemini(prompt):
-    return llm.invoke(prompt).content
+    return get_langchain_llm().invoke(prompt).content
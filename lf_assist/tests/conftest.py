@@ -0,0 +1,4 @@
+import os
+
+# Modules build their shared Gemini clients at import time; no request is sent
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
@@ -0,0 +1,114 @@
+import asyncio
+import gc
+import hashlib
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+
+from lf_assist.app import api, semantic_cache
+from lf_assist.app.semantic_cache import SemanticCache, VECTOR_SIZE
+
+
+def fake_encode(text: str) -> list[float]:
+    """Deterministic unit vector per text: equal texts score 1.0, others about 0."""
+    rng = np.random.default_rng(int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big"))
+    vector = rng.standard_normal(VECTOR_SIZE)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """LF Assist with an in-memory Qdrant cache and the LLM/retrieval calls replaced."""
+    monkeypatch.setattr(semantic_cache, "client", QdrantClient(":memory:"))
+    monkeypatch.setattr(semantic_cache, "encode_query", fake_encode)
+    monkeypatch.setattr(api, "response_cache", SemanticCache(threshold=0.95, ttl_seconds=3600))
+    monkeypatch.setattr(api, "conversation_store", {})
+
+    calls = {"summarize": 0}
+    tags = {}
+
+    async def fake_tag_queries(queries, path):
+        return [tags.get(q, ["Borrower"]) for q in queries]
+
+    async def fake_retrieve(queries, tags_list, chat_history=None, query_vectors=None):
+        return [["chunk"] for _ in queries]
+
+    async def fake_summarize(query, chunks, chat_history=None):
+        calls["summarize"] += 1
+        yield f"answer to {query}"
+
+    monkeypatch.setattr(api, "atag_queries", fake_tag_queries)
+    monkeypatch.setattr(api, "aget_relevant_chunks_batch", fake_retrieve)
+    monkeypatch.setattr(api, "encode_batch", lambda texts: [fake_encode(t) for t in texts])
+    monkeypatch.setattr(api, "asummarize_stream", fake_summarize)
+    return calls, tags
+
+
+def ask(query: str, session_id: str):
+    return asyncio.run(api.process_lf_chat(query, session_id))
+
+
+def test_second_session_gets_a_hit_for_the_same_first_question(pipeline):
+    calls, _ = pipeline
+    first = ask("How do I add a borrower?", "session-a")
+    second = ask("How do I add a borrower?", "session-b")
+
+    assert calls["summarize"] == 1
+    assert second.answer == first.answer
+    assert second.tags == first.tags
+    assert [m.content for m in api.conversation_store["session-b"]] == [
+        "How do I add a borrower?", first.answer
+    ]
+
+
+def test_questions_with_different_literals_do_not_share_answers(pipeline, monkeypatch):
+    calls, _ = pipeline
+    # Same embedding for both: only the literal guard tells them apart
+    monkeypatch.setattr(semantic_cache, "encode_query", lambda text: fake_encode("fee"))
+    ask("What is the fee for Plan A?", "session-a")
+    answer = ask("What is the fee for Plan B?", "session-b").answer
+
+    assert calls["summarize"] == 2
+    assert answer == "answer to What is the fee for Plan B?"
+
+
+def test_questions_with_different_tags_do_not_share_answers(pipeline, monkeypatch):
+    calls, tags = pipeline
+    monkeypatch.setattr(semantic_cache, "encode_query", lambda text: fake_encode("screen"))
+    # Sub-questions are tagged without their question mark
+    tags["Where is the payments screen"] = ["Payments"]
+    tags["Where is the borrowers screen"] = ["Borrower"]
+    ask("Where is the payments screen?", "session-a")
+    ask("Where is the borrowers screen?", "session-b")
+
+    assert calls["summarize"] == 2
+
+
+def test_follow_up_questions_skip_the_cache(pipeline):
+    calls, _ = pipeline
+    ask("How do I add a borrower?", "session-a")
+    ask("What is a co-borrower?", "session-b")
+    ask("How do I add a borrower?", "session-b")
+
+    assert calls["summarize"] == 3
+
+
+def test_no_cache_skips_lookup(pipeline):
+    calls, _ = pipeline
+    ask("How do I add a borrower?", "session-a")
+    asyncio.run(api.process_lf_chat("How do I add a borrower?", "session-b", use_cache=False))
+
+    assert calls["summarize"] == 2
+
+
+def test_session_lock_lives_exactly_as_long_as_a_turn_uses_it():
+    async def run():
+        async with api._session_lock("session-a"):
+            gc.collect()
+            assert "session-a" in api._session_locks
+            assert api._session_lock("session-a").locked()
+        gc.collect()
+        assert "session-a" not in api._session_locks
+
+    asyncio.run(run())
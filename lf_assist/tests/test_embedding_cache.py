@@ -0,0 +1,45 @@
+import numpy as np
+
+from lf_assist.app import embedding_cache
+from lf_assist.app.embedding_cache import EmbeddingCache
+
+
+def test_get_many_returns_vectors_in_key_order_with_none_for_misses(tmp_path):
+    keys = [EmbeddingCache.key(text) for text in ("a", "b", "c")]
+    with EmbeddingCache(str(tmp_path / "cache.sqlite3"), "model") as cache:
+        cache.put_many([(keys[2], [3.0, 3.0]), (keys[0], [1.0, 1.0])])
+
+        found = cache.get_many(keys)
+
+    np.testing.assert_array_equal(found[0], [1.0, 1.0])
+    assert found[1] is None
+    np.testing.assert_array_equal(found[2], [3.0, 3.0])
+    assert found[0].dtype == np.float32
+
+
+def test_get_many_spans_several_lookup_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "_LOOKUP_BATCH", 3)
+    keys = [EmbeddingCache.key(str(i)) for i in range(10)]
+    with EmbeddingCache(str(tmp_path / "cache.sqlite3"), "model") as cache:
+        cache.put_many((key, [float(i)]) for i, key in enumerate(keys) if i % 2 == 0)
+
+        found = cache.get_many(keys)
+
+    assert [None if v is None else float(v[0]) for v in found] == [
+        0.0, None, 2.0, None, 4.0, None, 6.0, None, 8.0, None
+    ]
+
+
+def test_vectors_are_scoped_to_the_model(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    key = EmbeddingCache.key("a")
+    with EmbeddingCache(path, "model-a") as cache:
+        cache.put_many([(key, [1.0])])
+    with EmbeddingCache(path, "model-b") as cache:
+        assert cache.get_many([key]) == [None]
+        assert cache.get(key) is None
+
+
+def test_get_many_with_no_keys(tmp_path):
+    with EmbeddingCache(str(tmp_path / "cache.sqlite3"), "model") as cache:
+        assert cache.get_many([]) == []
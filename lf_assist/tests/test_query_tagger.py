@@ -0,0 +1,52 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from lf_assist.app import query_tagger
+from lf_assist.app.query_tagger import _parse_batch, tag_queries
+
+
+def test_parse_batch_returns_tags_per_question_in_order():
+    response = (
+        "Question: How do I add a borrower?\n"
+        "Tag(s): Borrower, Onboarding\n"
+        "\n"
+        "Question: Where are payments listed?\n"
+        "Tag(s): Payments\n"
+    )
+    assert _parse_batch(response, 2) == [["Borrower", "Onboarding"], ["Payments"]]
+
+
+def test_parse_batch_keeps_empty_tag_lines_in_place():
+    assert _parse_batch("Tag(s):\nTag(s): Payments", 2) == [[], ["Payments"]]
+
+
+@pytest.mark.parametrize("response", ["Tag(s): Payments", "Tag(s): A\nTag(s): B\nTag(s): C", "no tags"])
+def test_parse_batch_rejects_responses_that_do_not_line_up(response):
+    assert _parse_batch(response, 2) is None
+
+
+@pytest.fixture
+def gemini(monkeypatch, tmp_path):
+    model = MagicMock()
+    monkeypatch.setattr(query_tagger, "get_gemini_model", lambda: model)
+    prompt = tmp_path / "tag_prompt.txt"
+    prompt.write_text("Tag this: {question}", encoding="utf-8")
+    return model, str(prompt)
+
+
+def test_tag_queries_uses_one_call_when_the_batch_lines_up(gemini):
+    model, prompt = gemini
+    model.generate.return_value = "Tag(s): A\nTag(s): B"
+
+    assert tag_queries(["first", "second"], prompt) == [["A"], ["B"]]
+    assert model.generate.call_count == 1
+    assert "1. first\n2. second" in model.generate.call_args.args[0]
+
+
+def test_tag_queries_falls_back_to_one_call_per_query(gemini):
+    model, prompt = gemini
+    model.generate.side_effect = ["Tag(s): only one", "Tag(s): A", "Tag(s): B"]
+
+    assert tag_queries(["first", "second"], prompt) == [["A"], ["B"]]
+    assert model.generate.call_count == 3
@@ -0,0 +1,40 @@
+import numpy as np
+
+from lf_assist.app.retriever import mmr_select
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+QUERY = unit(1.0, 0.0, 0.0)
+CANDIDATES = [
+    ({"content": "best"}, unit(0.95, 0.3, 0.0)),
+    ({"content": "near duplicate of best"}, unit(0.95, 0.32, 0.05)),
+    ({"content": "relevant but different"}, unit(0.9, -0.43, 0.0)),
+    ({"content": "unrelated"}, unit(0.0, 1.0, 0.0)),
+]
+
+
+def contents(payloads):
+    return [p["content"] for p in payloads]
+
+
+def test_returns_all_candidates_when_k_covers_them():
+    assert contents(mmr_select(QUERY, CANDIDATES[:2], k=5)) == ["best", "near duplicate of best"]
+
+
+def test_diverse_candidate_beats_near_duplicate():
+    assert contents(mmr_select(QUERY, CANDIDATES, k=2, lambda_=0.7)) == ["best", "relevant but different"]
+
+
+def test_lambda_one_is_plain_relevance_ranking():
+    assert contents(mmr_select(QUERY, CANDIDATES, k=3, lambda_=1.0)) == [
+        "best", "near duplicate of best", "relevant but different"
+    ]
+
+
+def test_never_selects_a_candidate_twice():
+    selected = contents(mmr_select(QUERY, CANDIDATES, k=3, lambda_=0.0))
+    assert len(selected) == len(set(selected)) == 3
@@ -0,0 +1,40 @@
+import pytest
+
+from lf_assist.app.summarizer import _StreamCleaner, clean_markdown
+
+ANSWER = (
+    "\n\n  Here are the **steps**:\n"
+    "* Open the **Loan** screen\n"
+    "* Click **Save**\n"
+    "\n"
+    "Done **now**.  \n\n"
+)
+
+
+def stream(text: str, size: int) -> str:
+    cleaner = _StreamCleaner()
+    pieces = [cleaner.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    pieces.append(cleaner.finish())
+    return "".join(pieces)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, len(ANSWER)])
+def test_stream_equals_clean_markdown_for_any_chunking(size):
+    assert stream(ANSWER, size) == clean_markdown(ANSWER)
+
+
+def test_bold_split_across_chunks_is_removed():
+    cleaner = _StreamCleaner()
+    out = cleaner.feed("Click **Sa") + cleaner.feed("ve** now\n") + cleaner.finish()
+    assert out == "Click Save now"
+
+
+def test_nothing_is_released_before_a_line_completes():
+    cleaner = _StreamCleaner()
+    assert cleaner.feed("* partial") == ""
+    assert cleaner.feed(" line\nnext") == "- partial line"
+    assert cleaner.finish() == "\nnext"
+
+
+def test_whitespace_only_stream_is_empty():
+    assert stream("\n  \n\n", 1) == ""
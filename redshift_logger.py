@@ -1,6 +1,11 @@
 # redshift_logger.py
 import os
-import json
+import orjson
+import atexit
+import queue
+import threading
+import time
+from functools import lru_cache
 from uuid import uuid4
 from datetime import datetime, timezone
 import redshift_connector
@@ -8,12 +13,34 @@ from app_logger import logger
 
 MAX_VARCHAR_BYTES = 65000
 
-def truncate_utf8_bytes(s: str | None, max_bytes: int = MAX_VARCHAR_BYTES) -> str | None:
+# Events are buffered and written by one background thread in multi-row
+# INSERTs, so request handlers never wait on a Redshift round trip
+FLUSH_BATCH_SIZE = 500
+# Redshift caps a statement at 16 MB; rows carry up to 4 x 65 KB of text
+MAX_BATCH_TEXT_BYTES = 8 * 1024 * 1024
+FLUSH_INTERVAL_SECONDS = 2.0
+MAX_PENDING_EVENTS = 10000
+
+_queue: "queue.Queue[tuple | None]" = queue.Queue(maxsize=MAX_PENDING_EVENTS)
+_writer: threading.Thread | None = None
+_writer_lock = threading.Lock()
+_conn = None
+_cur = None
+
+INSERT_SQL = """
+  INSERT INTO cdp.chat_logs
+  (event_id, created_at, session_id, chatbot, user_message, answer, response_json, is_error, error_message)
+  VALUES {rows}
+"""
+_ROW_PLACEHOLDER = "(%s,%s,%s,%s,%s,%s,%s,%s,%s)"
+
+def truncate_utf8_bytes(s: str | bytes | None, max_bytes: int = MAX_VARCHAR_BYTES) -> str | None:
+    """Truncate to max_bytes of UTF-8; already-encoded input skips the encode pass."""
     if s is None:
         return None
-    b = s.encode("utf-8")
+    b = s if isinstance(s, bytes) else s.encode("utf-8")
     if len(b) <= max_bytes:
-        return s
+        return b.decode("utf-8") if isinstance(s, bytes) else s
     suffix = "...[TRUNCATED]"
     cut = max_bytes - len(suffix.encode("utf-8"))
     return b[:cut].decode("utf-8", errors="ignore") + suffix
@@ -27,6 +54,101 @@ def get_conn():
         password=os.getenv("REDSHIFT_PASSWORD"),
     )
 
+def _get_shared_cursor():
+    """Writer thread's long-lived connection and cursor (reopened after a failure)."""
+    global _conn, _cur
+    if _cur is None:
+        _conn = get_conn()
+        _cur = _conn.cursor()
+    return _conn, _cur
+
+def _reset_conn():
+    global _conn, _cur
+    for resource in (_cur, _conn):
+        if resource is not None:
+            try:
+                resource.close()
+            except Exception:
+                pass
+    _conn = _cur = None
+
+@lru_cache(maxsize=32)
+def _insert_sql(row_count: int) -> str:
+    """INSERT text for `row_count` rows, built once per batch size."""
+    return INSERT_SQL.format(rows=",".join([_ROW_PLACEHOLDER] * row_count))
+
+def _insert_rows(rows: list[tuple]):
+    """Write rows with a single multi-row INSERT and one commit."""
+    params = [value for row in rows for value in row]
+
+    conn, cur = _get_shared_cursor()
+    try:
+        cur.execute(_insert_sql(len(rows)), params)
+        conn.commit()
+    except Exception:
+        _reset_conn()
+        raise
+
+def _row_text_size(row: tuple) -> int:
+    # Character count; close enough to bytes for sizing a batch
+    return sum(len(value) for value in row if isinstance(value, str))
+
+def _drain_batch(first: tuple) -> tuple[list[tuple], bool]:
+    """
+    Collect rows until FLUSH_BATCH_SIZE or FLUSH_INTERVAL_SECONDS after the
+    first one; True if the stop marker was seen.
+    """
+    rows = [first]
+    size = _row_text_size(first)
+    deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+    while len(rows) < FLUSH_BATCH_SIZE and size < MAX_BATCH_TEXT_BYTES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            row = _queue.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if row is None:
+            return rows, True
+        rows.append(row)
+        size += _row_text_size(row)
+    return rows, False
+
+def _writer_loop():
+    stop = False
+    while not stop:
+        first = _queue.get()
+        if first is None:
+            break
+
+        rows, stop = _drain_batch(first)
+        try:
+            _insert_rows(rows)
+            logger.info(f"Logged {len(rows)} events to Redshift")
+        except Exception as e:
+            logger.error(f"Redshift logging failed for {len(rows)} events (non-fatal): {e}")
+
+    _reset_conn()
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_writer_loop, name="redshift-logger", daemon=True)
+            _writer.start()
+
+def shutdown(timeout: float = 10.0):
+    """Flush pending events and stop the writer thread."""
+    if _writer is None:
+        return
+    _queue.put(None)
+    _writer.join(timeout)
+
+atexit.register(shutdown)
+
 def safe_log_to_redshift(*, session_id: str | None, chatbot: str, user_message: str | None,
                          answer: str | None, response_payload: dict | None,
                          is_error: bool, error_message: str | None):
@@ -34,7 +156,11 @@ def safe_log_to_redshift(*, session_id: str | None, chatbot: str, user_message:
         event_id = str(uuid4())
         created_at = datetime.now(timezone.utc)
 
-        response_json = json.dumps(response_payload, ensure_ascii=False, default=str) if response_payload else None
+        # orjson returns UTF-8 bytes directly, which truncate_utf8_bytes slices without re-encoding
+        response_json = (
+            orjson.dumps(response_payload, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+            if response_payload else None
+        )
 
         session_id = truncate_utf8_bytes(session_id)
         chatbot = truncate_utf8_bytes(chatbot)
@@ -43,19 +169,11 @@ def safe_log_to_redshift(*, session_id: str | None, chatbot: str, user_message:
         response_json = truncate_utf8_bytes(response_json)
         error_message = truncate_utf8_bytes(error_message)
 
-        sql = """
-          INSERT INTO cdp.chat_logs
-          (event_id, created_at, session_id, chatbot, user_message, answer, response_json, is_error, error_message)
-          VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """
-
-        with get_conn() as conn:
-            with conn.cursor() as cur:
-                cur.execute(sql, (event_id, created_at, session_id, chatbot, user_message,
-                                  answer, response_json, is_error, error_message))
-            conn.commit()
-
-        logger.info(f"Logged to Redshift: chatbot={chatbot}, is_error={is_error}")
+        _ensure_writer()
+        _queue.put_nowait((event_id, created_at, session_id, chatbot, user_message,
+                           answer, response_json, is_error, error_message))
 
+    except queue.Full:
+        logger.error(f"Redshift log queue full, dropping event (non-fatal): chatbot={chatbot}, is_error={is_error}")
     except Exception as e:
         logger.error(f"Redshift logging failed (non-fatal): {e}")
@@ -8,6 +8,8 @@ from services.gemini_service import (
     get_langchain_llm,
     get_sql_generator_llm,
 )
+from services.semantic_cache import SemanticCache, question_literals
+from services.sql_prompt import build_sql_messages, static_context_prefix
 
 __all__ = [
     "GeminiClient",
@@ -15,4 +17,8 @@ __all__ = [
     "get_gemini_client",
     "get_langchain_llm",
     "get_sql_generator_llm",
+    "SemanticCache",
+    "question_literals",
+    "build_sql_messages",
+    "static_context_prefix",
 ]
@@ -11,6 +11,13 @@ Usage:
     client = get_gemini_client()
     response = client.generate(prompt)
     response = await client.generate_async(prompt)
+    for text in client.generate_stream(prompt):
+        ...
+    async for text in client.generate_stream_async(prompt):
+        ...
+    answer = await client.answer_pdf_async(question, pdf_bytes)
+    job = await client.create_batch_async([{"contents": [...]}, ...])
+    job = await client.get_batch_async(job.name)
     
     # For LangChain-based workflows
     from services import get_langchain_llm, get_sql_generator_llm
@@ -18,9 +25,22 @@ Usage:
     sql_llm = get_sql_generator_llm()  # With safety settings disabled
 """
 
+import asyncio
+import hashlib
+import io
 import os
-from typing import Optional, Any, Dict, List, Union
+import threading
+import time
+from collections import deque
+from typing import Optional, Any, AsyncIterator, Deque, Dict, Iterator, List, Tuple, Union
+import httpx
+from cachetools import TTLCache
 from dotenv import load_dotenv
+from google import genai
+from google.genai import errors, types
+from google.genai.types import Blob, Content, FileData, Part
+from langchain_google_genai import ChatGoogleGenerativeAI
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 from app_logger import logger
 
 load_dotenv()
@@ -33,6 +53,31 @@ DEFAULT_MODEL = "gemini-2.5-flash"
 DEFAULT_MAX_TOKENS = 2048
 DEFAULT_TEMPERATURE = 0.0
 
+# httpx options for the SDK's sync/async transports. One pooled HTTP/2
+# connection is reused (and multiplexed) by every request of the process.
+# Idle connections are kept for 2 minutes (httpx defaults to 5s), so calls a
+# few seconds apart don't pay a new TCP + TLS handshake.
+HTTP_CLIENT_ARGS = {
+    "http2": True,
+    "limits": httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=120),
+}
+
+# Retries for rate limits (429) and transient server errors, with full-jitter
+# exponential backoff so concurrent callers don't retry in lockstep
+RETRYABLE_STATUS_CODES = {429, 500, 503, 504}
+MAX_ATTEMPTS = 5
+MAX_BACKOFF_SECONDS = 30
+
+# Outbound throttle, kept at RATE_LIMIT_HEADROOM of the project's quota so
+# bursts queue briefly instead of tripping 429s (0 disables a limit)
+GEMINI_RPM_LIMIT = int(os.getenv("GEMINI_RPM_LIMIT", "1000"))
+GEMINI_TPM_LIMIT = int(os.getenv("GEMINI_TPM_LIMIT", "1000000"))
+RATE_LIMIT_HEADROOM = 0.8
+
+# Files API uploads are deleted after 48h; reuse them a little less long
+UPLOADED_FILE_TTL_SECONDS = 47 * 3600
+UPLOADED_FILE_CACHE_SIZE = 256
+
 # Safety settings for SQL/code generation (disabled for technical content)
 SAFETY_SETTINGS_DISABLED = {
     "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
@@ -52,6 +97,155 @@ def _get_api_key() -> str:
     return api_key
 
 
+def _is_retryable(exc: BaseException) -> bool:
+    """True for Gemini API errors worth retrying (rate limited / unavailable)."""
+    return isinstance(exc, errors.APIError) and exc.code in RETRYABLE_STATUS_CODES
+
+
+def _log_retry(retry_state) -> None:
+    logger.warning(
+        f"Gemini call failed ({retry_state.outcome.exception()}), "
+        f"retry {retry_state.attempt_number}/{MAX_ATTEMPTS - 1} in {retry_state.next_action.sleep:.1f}s"
+    )
+
+
+# Works on both sync and async methods
+_with_backoff = retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=wait_random_exponential(multiplier=1, max=MAX_BACKOFF_SECONDS),
+    stop=stop_after_attempt(MAX_ATTEMPTS),
+    before_sleep=_log_retry,
+    reraise=True,
+)
+
+
+# =============================================================================
+# RateLimiter
+# =============================================================================
+
+# Gemini bills documents per page (258 tokens each), not per byte. Binary
+# parts are counted as a document at doc_assist's 20-page cap: byte size says
+# little about page count, and len // 4 made one 4 MB PDF look like 1M tokens.
+TOKENS_PER_DOCUMENT_PAGE = 258
+BINARY_PART_TOKENS = TOKENS_PER_DOCUMENT_PAGE * 20
+
+
+def estimate_tokens(contents: Any) -> int:
+    """Rough token estimate of a prompt, Content, Part or list of them (~4 characters per text token)."""
+    if isinstance(contents, str):
+        return len(contents) // 4
+    if isinstance(contents, (bytes, bytearray, memoryview)):
+        return BINARY_PART_TOKENS
+    if isinstance(contents, dict):
+        return sum(estimate_tokens(v) for v in contents.values())
+    if isinstance(contents, (list, tuple)):
+        return sum(estimate_tokens(v) for v in contents)
+    
+    # Content.parts, Part.text / Part.inline_data, Blob.data
+    total = 0
+    for attr in ("parts", "text", "inline_data", "data"):
+        value = getattr(contents, attr, None)
+        if value is not None:
+            total += estimate_tokens(value)
+    return total
+
+
+class RateLimiter:
+    """
+    Sliding-window limiter over requests and estimated tokens per minute.
+    
+    Callers block (or await) just long enough for the window to have room,
+    so a burst is spread out instead of being rejected upstream. Safe to
+    share between threads and event loops.
+    
+    Args:
+        rpm: Requests per window (0 = unlimited)
+        tpm: Estimated tokens per window (0 = unlimited)
+        window: Window length in seconds
+    """
+    
+    def __init__(self, rpm: int, tpm: int, window: float = 60.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self._lock = threading.Lock()
+        self._events: Deque[Tuple[float, int]] = deque()
+        self._tokens = 0
+    
+    def _reserve(self, tokens: int) -> float:
+        """Take a slot and return 0.0, or return how long to wait before trying again."""
+        if self.tpm:
+            # A single oversized request must still fit an empty window
+            tokens = min(tokens, self.tpm)
+        
+        with self._lock:
+            now = time.monotonic()
+            while self._events and self._events[0][0] <= now - self.window:
+                self._tokens -= self._events.popleft()[1]
+            
+            wait = 0.0
+            if self.rpm and len(self._events) >= self.rpm:
+                wait = self._events[len(self._events) - self.rpm][0] + self.window - now
+            if self.tpm and self._tokens + tokens > self.tpm:
+                excess = self._tokens + tokens - self.tpm
+                for ts, used in self._events:
+                    excess -= used
+                    if excess <= 0:
+                        wait = max(wait, ts + self.window - now)
+                        break
+            
+            if wait <= 0:
+                self._events.append((now, tokens))
+                self._tokens += tokens
+            return wait
+    
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until a request of `tokens` estimated tokens fits the window."""
+        while (wait := self._reserve(tokens)) > 0:
+            time.sleep(wait)
+    
+    async def acquire_async(self, tokens: int = 0) -> None:
+        """Async variant of acquire; waits without blocking the event loop."""
+        while (wait := self._reserve(tokens)) > 0:
+            await asyncio.sleep(wait)
+
+
+# Shared by every GeminiClient: the quota is per project, not per instance
+rate_limiter = RateLimiter(
+    rpm=int(GEMINI_RPM_LIMIT * RATE_LIMIT_HEADROOM),
+    tpm=int(GEMINI_TPM_LIMIT * RATE_LIMIT_HEADROOM),
+)
+
+
+# =============================================================================
+# Shared SDK client
+# =============================================================================
+
+_genai_client = None
+_genai_client_lock = threading.Lock()
+
+
+def _get_genai_client():
+    """
+    The process-wide google-genai Client. Built once (API key lookup, HTTP
+    transport setup) and shared by every GeminiClient, whatever its model,
+    so all of them reuse one connection pool.
+    """
+    global _genai_client
+    if _genai_client is None:
+        with _genai_client_lock:
+            if _genai_client is None:
+                # Pass API key explicitly to avoid "Both GOOGLE_API_KEY and GEMINI_API_KEY are set" warning
+                _genai_client = genai.Client(
+                    api_key=_get_api_key(),
+                    http_options=types.HttpOptions(
+                        client_args=HTTP_CLIENT_ARGS,
+                        async_client_args=HTTP_CLIENT_ARGS,
+                    ),
+                )
+    return _genai_client
+
+
 # =============================================================================
 # GeminiClient - Direct Google GenAI SDK
 # =============================================================================
@@ -84,23 +278,40 @@ class GeminiClient:
         response = client.generate_content(content)
     """
     
-    _instance: Optional["GeminiClient"] = None
+    _instances: Dict[str, "GeminiClient"] = {}
+    _instance_lock = threading.Lock()
     
     def __init__(self, model: str = DEFAULT_MODEL):
-        from google import genai
-        
         self.model = model
-        # Pass API key explicitly to avoid "Both GOOGLE_API_KEY and GEMINI_API_KEY are set" warning
-        self._client = genai.Client(api_key=_get_api_key())
+        self._client = _get_genai_client()
+        # sha256(PDF) -> uploaded File, so repeat questions reference one upload
+        self._uploaded_pdfs: TTLCache = TTLCache(maxsize=UPLOADED_FILE_CACHE_SIZE, ttl=UPLOADED_FILE_TTL_SECONDS)
+        self._uploaded_pdfs_lock = threading.Lock()
         logger.debug(f"GeminiClient initialized with model: {model}")
     
     @classmethod
     def get_instance(cls, model: str = DEFAULT_MODEL) -> "GeminiClient":
-        """Get singleton instance of GeminiClient."""
-        if cls._instance is None:
-            cls._instance = cls(model=model)
-        return cls._instance
+        """Get the shared GeminiClient for `model` (thread-safe)."""
+        instance = cls._instances.get(model)
+        if instance is None:
+            with cls._instance_lock:
+                instance = cls._instances.get(model)
+                if instance is None:
+                    instance = cls._instances[model] = cls(model=model)
+        return instance
+    
+    async def warm_async(self) -> None:
+        """
+        Open the async connection pool with a cheap model-metadata request, so
+        the first user query doesn't pay the TCP + TLS handshake. Never raises.
+        """
+        try:
+            await self._client.aio.models.get(model=self.model)
+            logger.debug(f"GeminiClient connection warmed for model: {self.model}")
+        except Exception as e:
+            logger.warning(f"Gemini warm-up failed (non-fatal): {e}")
     
+    @_with_backoff
     def generate(
         self,
         prompt: Union[str, Any],
@@ -116,6 +327,7 @@ class GeminiClient:
         Returns:
             Generated text response
         """
+        rate_limiter.acquire(estimate_tokens(prompt))
         try:
             response = self._client.models.generate_content(
                 model=model or self.model,
@@ -126,6 +338,7 @@ class GeminiClient:
             logger.error(f"Gemini generation error: {e}")
             raise
     
+    @_with_backoff
     async def generate_async(
         self,
         prompt: Union[str, Any],
@@ -141,6 +354,7 @@ class GeminiClient:
         Returns:
             Generated text response
         """
+        await rate_limiter.acquire_async(estimate_tokens(prompt))
         try:
             response = await self._client.aio.models.generate_content(
                 model=model or self.model,
@@ -151,6 +365,62 @@ class GeminiClient:
             logger.error(f"Gemini async generation error: {e}")
             raise
     
+    def generate_stream(
+        self,
+        prompt: Union[str, Any],
+        model: Optional[str] = None,
+    ) -> Iterator[str]:
+        """
+        Stream generated text synchronously, yielding chunks as they arrive.
+        
+        Args:
+            prompt: Text prompt or Content object
+            model: Optional model override
+            
+        Yields:
+            Text fragments of the response
+        """
+        rate_limiter.acquire(estimate_tokens(prompt))
+        try:
+            for chunk in self._client.models.generate_content_stream(
+                model=model or self.model,
+                contents=prompt
+            ):
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            logger.error(f"Gemini streaming generation error: {e}")
+            raise
+    
+    async def generate_stream_async(
+        self,
+        prompt: Union[str, Any],
+        model: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated text asynchronously, yielding chunks as they arrive.
+        
+        Args:
+            prompt: Text prompt or Content object
+            model: Optional model override
+            
+        Yields:
+            Text fragments of the response
+        """
+        await rate_limiter.acquire_async(estimate_tokens(prompt))
+        try:
+            stream = await self._client.aio.models.generate_content_stream(
+                model=model or self.model,
+                contents=prompt
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            logger.error(f"Gemini streaming generation error: {e}")
+            raise
+    
+    @_with_backoff
     def generate_content(
         self,
         contents: Any,
@@ -175,8 +445,10 @@ class GeminiClient:
         if config:
             kwargs["config"] = config
         
+        rate_limiter.acquire(estimate_tokens(contents))
         return self._client.models.generate_content(**kwargs)
     
+    @_with_backoff
     async def generate_content_async(
         self,
         contents: Any,
@@ -201,7 +473,97 @@ class GeminiClient:
         if config:
             kwargs["config"] = config
         
+        await rate_limiter.acquire_async(estimate_tokens(contents))
         return await self._client.aio.models.generate_content(**kwargs)
+    
+    @staticmethod
+    def _pdf_question(question: str, pdf_part: Any) -> List[Any]:
+        return [Content(parts=[Part(text=question), pdf_part])]
+    
+    @staticmethod
+    def _inline_pdf_part(pdf_bytes: bytes) -> Any:
+        return Part(inline_data=Blob(mime_type="application/pdf", data=pdf_bytes))
+    
+    async def pdf_file_part_async(self, pdf_bytes: bytes) -> Any:
+        """
+        Part referencing `pdf_bytes` through the Files API, uploading it only
+        the first time it is seen. Falls back to an inline part if the upload fails.
+        """
+        key = hashlib.sha256(pdf_bytes).digest()
+        with self._uploaded_pdfs_lock:
+            uploaded = self._uploaded_pdfs.get(key)
+        
+        if uploaded is None:
+            try:
+                uploaded = await self.upload_file_async(pdf_bytes, mime_type="application/pdf")
+            except Exception as e:
+                logger.warning(f"PDF upload to the Files API failed, sending inline: {e}")
+                return self._inline_pdf_part(pdf_bytes)
+            with self._uploaded_pdfs_lock:
+                self._uploaded_pdfs[key] = uploaded
+        
+        return Part(file_data=FileData(file_uri=uploaded.uri, mime_type=uploaded.mime_type))
+    
+    def answer_pdf(self, question: str, pdf_bytes: bytes, model: Optional[str] = None) -> str:
+        """
+        Answer a question about a PDF sent inline (the single code path for
+        Doc Assist; callers add their own validation and caching).
+        
+        Returns:
+            Generated text response
+        """
+        contents = self._pdf_question(question, self._inline_pdf_part(pdf_bytes))
+        return self.generate_content(contents, model=model).text
+    
+    async def answer_pdf_async(self, question: str, pdf_bytes: bytes, model: Optional[str] = None) -> str:
+        """
+        Async variant of answer_pdf. The PDF is uploaded once and referenced
+        by URI, so further questions about it don't resend the bytes.
+        """
+        contents = self._pdf_question(question, await self.pdf_file_part_async(pdf_bytes))
+        response = await self.generate_content_async(contents, model=model)
+        return response.text
+    
+    async def upload_file_async(self, data: bytes, mime_type: str) -> Any:
+        """
+        Upload bytes to the Gemini Files API so several requests can
+        reference them by URI instead of inlining them.
+        
+        Returns:
+            File object (use .uri and .mime_type in a FileData part)
+        """
+        return await self._client.aio.files.upload(
+            file=io.BytesIO(data),
+            config=types.UploadFileConfig(mime_type=mime_type)
+        )
+    
+    async def create_batch_async(
+        self,
+        requests: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        display_name: Optional[str] = None,
+    ) -> Any:
+        """
+        Submit inline generate_content requests as one Batch Mode job
+        (half the per-token cost, results within 24h).
+        
+        Args:
+            requests: Inlined requests, e.g. {"contents": [...]}
+            model: Optional model override
+            display_name: Optional job label
+            
+        Returns:
+            BatchJob object (poll with get_batch_async(job.name))
+        """
+        return await self._client.aio.batches.create(
+            model=model or self.model,
+            src=requests,
+            config=types.CreateBatchJobConfig(display_name=display_name)
+        )
+    
+    async def get_batch_async(self, name: str) -> Any:
+        """Fetch the current state (and inline results, once done) of a batch job."""
+        return await self._client.aio.batches.get(name=name)
 
 
 # =============================================================================
@@ -229,6 +591,7 @@ class GeminiLangChain:
     
     _llm_instance = None
     _sql_llm_instance = None
+    _instance_lock = threading.Lock()
     
     @classmethod
     def get_llm(
@@ -248,21 +611,23 @@ class GeminiLangChain:
             convert_system_message_to_human: Convert system messages for Gemini compatibility
             
         Returns:
-            ChatGoogleGenerativeAI instance
+            ChatGoogleGenerativeAI instance (shared, created once under a lock)
         """
-        from langchain_google_genai import ChatGoogleGenerativeAI
-        
-        if cls._llm_instance is None:
-            cls._llm_instance = ChatGoogleGenerativeAI(
-                model=model,
-                google_api_key=_get_api_key(),
-                temperature=temperature,
-                max_output_tokens=max_output_tokens,
-                convert_system_message_to_human=convert_system_message_to_human,
-            )
-            logger.debug(f"LangChain LLM initialized with model: {model}")
+        instance = cls._llm_instance
+        if instance is None:
+            with cls._instance_lock:
+                instance = cls._llm_instance
+                if instance is None:
+                    instance = cls._llm_instance = ChatGoogleGenerativeAI(
+                        model=model,
+                        google_api_key=_get_api_key(),
+                        temperature=temperature,
+                        max_output_tokens=max_output_tokens,
+                        convert_system_message_to_human=convert_system_message_to_human,
+                    )
+                    logger.debug(f"LangChain LLM initialized with model: {model}")
         
-        return cls._llm_instance
+        return instance
     
     @classmethod
     def get_sql_llm(
@@ -282,20 +647,22 @@ class GeminiLangChain:
         Returns:
             ChatGoogleGenerativeAI instance configured for SQL
         """
-        from langchain_google_genai import ChatGoogleGenerativeAI
+        instance = cls._sql_llm_instance
+        if instance is None:
+            with cls._instance_lock:
+                instance = cls._sql_llm_instance
+                if instance is None:
+                    instance = cls._sql_llm_instance = ChatGoogleGenerativeAI(
+                        model=model,
+                        google_api_key=_get_api_key(),
+                        temperature=temperature,
+                        max_output_tokens=max_output_tokens,
+                        convert_system_message_to_human=True,
+                        safety_settings=SAFETY_SETTINGS_DISABLED,
+                    )
+                    logger.debug(f"SQL LangChain LLM initialized with model: {model}")
         
-        if cls._sql_llm_instance is None:
-            cls._sql_llm_instance = ChatGoogleGenerativeAI(
-                model=model,
-                google_api_key=_get_api_key(),
-                temperature=temperature,
-                max_output_tokens=max_output_tokens,
-                convert_system_message_to_human=True,
-                safety_settings=SAFETY_SETTINGS_DISABLED,
-            )
-            logger.debug(f"SQL LangChain LLM initialized with model: {model}")
-        
-        return cls._sql_llm_instance
+        return instance
     
     @classmethod
     def create_llm(
@@ -322,8 +689,6 @@ class GeminiLangChain:
         Returns:
             New ChatGoogleGenerativeAI instance
         """
-        from langchain_google_genai import ChatGoogleGenerativeAI
-        
         config = {
             "model": model,
             "google_api_key": _get_api_key(),
@@ -0,0 +1,168 @@
+"""
+Semantic Response Cache
+
+Caches LLM-backed answers keyed on the embedding of the user's question, so
+near-duplicate questions are served from memory instead of re-running the
+agent/LLM pipeline.
+
+Entries are namespaced (e.g. by thread_id / session_id, or one shared scope
+for answers that don't depend on the user), and expire after a TTL. At most
+max_namespaces namespaces are held; one that goes a full TTL without a write
+is dropped whole.
+
+Usage:
+    from services import SemanticCache
+    cache = SemanticCache(embed_fn=embeddings.embed_query)
+
+    vector = cache.embed(question)
+    cached = cache.lookup(thread_id, vector)
+    if cached is None:
+        answer = run_agent(question)
+        cache.add(thread_id, vector, answer)
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+import numpy as np
+from cachetools import TTLCache
+from app_logger import logger
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+DEFAULT_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+DEFAULT_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_MAX_NAMESPACES = 1024
+
+# Numbers, quoted strings and capitalised words (ids, dates, states, names)
+_LITERAL_RE = re.compile(r"\d+(?:\.\d+)?|'[^']*'|\"[^\"]*\"|\b[A-Z][\w-]*")
+
+
+def question_literals(question: str) -> list:
+    """
+    Literal values in a question. Questions differing only in an entity or date
+    embed almost identically, so a cache shared between users should also
+    require equal literals for a hit.
+    """
+    # The first word is capitalised anyway
+    words = question.strip().split(maxsplit=1)
+    rest = words[1] if len(words) > 1 else ""
+    return sorted(set(_LITERAL_RE.findall(rest)))
+
+
+def _normalize(vector: Sequence[float]) -> np.ndarray:
+    """Return the vector as a unit-length float32 array (cosine == dot product)."""
+    arr = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(arr)
+    return arr / norm if norm else arr
+
+
+# =============================================================================
+# SemanticCache
+# =============================================================================
+
+class SemanticCache:
+    """
+    In-process semantic cache using a flat inner-product index per namespace.
+
+    Args:
+        embed_fn: Callable mapping text -> embedding vector. Use the same
+                  embedder as the retrieval path so vectors are comparable.
+        threshold: Minimum cosine similarity for a hit.
+        ttl_seconds: Maximum age of an entry before it is ignored.
+        max_entries: Maximum entries kept per namespace (oldest evicted first).
+        max_namespaces: Maximum namespaces kept (least recently written evicted first).
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], Sequence[float]],
+        threshold: float = DEFAULT_THRESHOLD,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_namespaces: int = DEFAULT_MAX_NAMESPACES,
+    ):
+        self._embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # namespace -> {"vectors": (n, d) array, "responses": list, "ts": list}.
+        # Every add re-inserts its namespace, so a namespace expires one TTL
+        # after its newest entry, when all of its entries are stale anyway.
+        self._store: TTLCache = TTLCache(maxsize=max_namespaces, ttl=ttl_seconds, timer=time.monotonic)
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed and normalize a question."""
+        return _normalize(self._embed_fn(text))
+
+    def lookup(self, namespace: str, vector: np.ndarray) -> Optional[Any]:
+        """
+        Return the cached response for the closest question in `namespace`,
+        or None if nothing is similar enough or the match has expired.
+        """
+        with self._lock:
+            entry = self._store.get(namespace)
+            if not entry or not entry["responses"]:
+                return None
+
+            self._evict_expired(entry)
+            if not entry["responses"]:
+                return None
+
+            sims = entry["vectors"] @ vector
+            best = int(np.argmax(sims))
+            score = float(sims[best])
+            response = entry["responses"][best] if score >= self.threshold else None
+
+        if response is not None:
+            logger.debug(f"Semantic cache hit (namespace={namespace}, score={score:.4f})")
+        else:
+            logger.debug(f"Semantic cache miss (namespace={namespace}, best score={score:.4f})")
+        return response
+
+    def add(self, namespace: str, vector: np.ndarray, response: Any) -> None:
+        """Store a response for `vector` in `namespace`."""
+        with self._lock:
+            entry = self._store.get(namespace) or {
+                "vectors": np.empty((0, vector.shape[0]), dtype=np.float32), "responses": [], "ts": []
+            }
+            self._store[namespace] = entry
+            entry["vectors"] = np.vstack([entry["vectors"], vector[np.newaxis, :]])
+            entry["responses"].append(response)
+            entry["ts"].append(time.monotonic())
+
+            overflow = len(entry["responses"]) - self.max_entries
+            if overflow > 0:
+                self._drop_oldest(entry, overflow)
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """Drop all entries for `namespace`, or the whole cache if None."""
+        with self._lock:
+            if namespace is None:
+                self._store.clear()
+            else:
+                self._store.pop(namespace, None)
+
+    def _evict_expired(self, entry: Dict[str, Any]) -> None:
+        """Drop entries older than the TTL (timestamps are in insertion order)."""
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = 0
+        for ts in entry["ts"]:
+            if ts >= cutoff:
+                break
+            expired += 1
+        if expired:
+            self._drop_oldest(entry, expired)
+
+    @staticmethod
+    def _drop_oldest(entry: Dict[str, Any], count: int) -> None:
+        entry["vectors"] = entry["vectors"][count:]
+        del entry["responses"][:count]
+        del entry["ts"][:count]
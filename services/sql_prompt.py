@@ -0,0 +1,49 @@
+"""
+SQL Generation Prompts
+
+Message building shared by the DB Assist and Viz Assist SQL generators. Each
+assistant keeps its own system prompt; the user message layout is common.
+
+Per-deployment context (database type, join details) goes first as a memoized
+prefix, so every request starts with the same bytes (Gemini's implicit prompt
+caching reuses identical prefixes); only the retrieved schema and the question
+vary per call.
+
+Usage:
+    from services import build_sql_messages
+    messages = build_sql_messages(SYSTEM_PROMPT, question, schema_info, join_details, "Redshift")
+    response = get_sql_generator_llm().invoke(messages)
+"""
+
+from functools import lru_cache
+from typing import List
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+
+@lru_cache(maxsize=8)
+def static_context_prefix(database_type: str, join_details: str) -> str:
+    """Static head of the user message, identical for every question in a deployment."""
+    return f"Database Type: {database_type}\n\nJoin Details:\n{join_details}\n\n"
+
+
+def build_sql_messages(
+    system_prompt: str,
+    user_request: str,
+    schema_info: str,
+    join_details: str,
+    database_type: str,
+) -> List[BaseMessage]:
+    """Build the system + user message payload for generating one SQL query."""
+    user_context = "".join((
+        static_context_prefix(database_type, str(join_details)),
+        "Schema Information:\n",
+        str(schema_info),
+        "\n\nUser Question:\n",
+        user_request,
+        "\n\nGenerate the appropriate SQL query:",
+    ))
+    return [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=user_context),
+    ]
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from google.genai.types import Blob, Content, Part
+
+from services import gemini_service
+from services.gemini_service import BINARY_PART_TOKENS, RateLimiter, estimate_tokens
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(gemini_service.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(gemini_service.time, "sleep", fake.sleep)
+    return fake
+
+
+def test_estimate_tokens_text():
+    assert estimate_tokens("a" * 400) == 100
+    assert estimate_tokens(["a" * 40, {"text": "a" * 40}]) == 20
+
+
+def test_estimate_tokens_counts_binary_parts_as_a_document():
+    small = Part(inline_data=Blob(data=b"%PDF" * 10, mime_type="application/pdf"))
+    large = Part(inline_data=Blob(data=b"%PDF" * 1_000_000, mime_type="application/pdf"))
+    content = Content(role="user", parts=[Part(text="a" * 40), large])
+
+    assert estimate_tokens(small) == estimate_tokens(large) == BINARY_PART_TOKENS
+    assert estimate_tokens(content) == 10 + BINARY_PART_TOKENS
+
+
+def test_requests_within_limits_do_not_wait(clock):
+    limiter = RateLimiter(rpm=3, tpm=0)
+    for _ in range(3):
+        limiter.acquire()
+    assert clock.slept == []
+
+
+def test_rpm_waits_for_oldest_request_to_leave_window(clock):
+    limiter = RateLimiter(rpm=2, tpm=0, window=60)
+    limiter.acquire()
+    clock.now += 10
+    limiter.acquire()
+    clock.now += 5
+
+    limiter.acquire()
+    assert clock.slept == [pytest.approx(45)]
+
+
+def test_tpm_waits_until_enough_tokens_expire(clock):
+    limiter = RateLimiter(rpm=0, tpm=100, window=60)
+    limiter.acquire(tokens=60)
+    clock.now += 20
+    limiter.acquire(tokens=30)
+
+    limiter.acquire(tokens=50)
+    assert clock.slept == [pytest.approx(40)]
+
+
+def test_oversized_request_fits_an_empty_window(clock):
+    limiter = RateLimiter(rpm=0, tpm=100)
+    limiter.acquire(tokens=10_000)
+    assert clock.slept == []
+
+
+def test_acquire_async_waits_without_blocking(clock, monkeypatch):
+    async def fake_sleep(seconds):
+        clock.sleep(seconds)
+
+    monkeypatch.setattr(gemini_service.asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter(rpm=1, tpm=0, window=60)
+
+    async def run():
+        await limiter.acquire_async()
+        await limiter.acquire_async()
+
+    asyncio.run(run())
+    assert clock.slept == [pytest.approx(60)]
@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from services import semantic_cache
+from services.semantic_cache import SemanticCache, question_literals
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    # Patched before the cache is built so its TTLCache timer is the fake too
+    monkeypatch.setattr(semantic_cache.time, "monotonic", fake)
+    return fake
+
+
+def make_cache(**kwargs):
+    vectors = {
+        "total loans": [1.0, 0.0, 0.0],
+        "sum of loans": [0.99, 0.1, 0.0],
+        "loans by state": [0.0, 1.0, 0.0],
+    }
+    return SemanticCache(embed_fn=lambda text: vectors[text], threshold=0.95, **kwargs)
+
+
+def test_embed_normalizes():
+    cache = make_cache()
+    vector = cache.embed("sum of loans")
+    assert vector.dtype == np.float32
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
+
+
+def test_lookup_hits_similar_and_misses_different(clock):
+    cache = make_cache()
+    cache.add("shared", cache.embed("total loans"), "answer")
+
+    assert cache.lookup("shared", cache.embed("sum of loans")) == "answer"
+    assert cache.lookup("shared", cache.embed("loans by state")) is None
+    assert cache.lookup("other", cache.embed("total loans")) is None
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = make_cache(ttl_seconds=60)
+    cache.add("shared", cache.embed("total loans"), "old")
+    clock.now += 30
+    cache.add("shared", cache.embed("loans by state"), "new")
+
+    clock.now += 31
+    assert cache.lookup("shared", cache.embed("total loans")) is None
+    assert cache.lookup("shared", cache.embed("loans by state")) == "new"
+
+
+def test_namespace_dropped_after_ttl_without_writes(clock):
+    cache = make_cache(ttl_seconds=60)
+    cache.add("shared", cache.embed("total loans"), "answer")
+
+    clock.now += 61
+    assert cache.lookup("shared", cache.embed("total loans")) is None
+    assert "shared" not in cache._store
+
+
+def test_max_entries_evicts_oldest(clock):
+    cache = make_cache(max_entries=1)
+    cache.add("shared", cache.embed("total loans"), "first")
+    cache.add("shared", cache.embed("loans by state"), "second")
+
+    assert cache.lookup("shared", cache.embed("total loans")) is None
+    assert cache.lookup("shared", cache.embed("loans by state")) == "second"
+
+
+def test_max_namespaces_evicts_least_recently_written(clock):
+    cache = make_cache(max_namespaces=2)
+    vector = cache.embed("total loans")
+    cache.add("a", vector, "a")
+    cache.add("b", vector, "b")
+    cache.add("a", vector, "a2")
+    cache.add("c", vector, "c")
+
+    assert cache.lookup("a", vector) == "a"
+    assert cache.lookup("b", vector) is None
+    assert cache.lookup("c", vector) == "c"
+
+
+def test_clear(clock):
+    cache = make_cache()
+    vector = cache.embed("total loans")
+    cache.add("a", vector, "a")
+    cache.add("b", vector, "b")
+
+    cache.clear("a")
+    assert cache.lookup("a", vector) is None
+    assert cache.lookup("b", vector) == "b"
+
+    cache.clear()
+    assert cache.lookup("b", vector) is None
+
+
+def test_question_literals():
+    assert question_literals("Show loans in Texas over 5000 for 'Acme'") == ["'Acme'", "5000", "Texas"]
+    assert question_literals("What is the fee for Plan A?") != question_literals("What is the fee for Plan B?")
+    assert question_literals("How do you add a borrower?") == []
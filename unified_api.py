@@ -5,7 +5,7 @@ load_dotenv(override=True)
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, status, Path, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from pydantic import BaseModel, Field, ConfigDict
 from uuid import uuid4
 import asyncio
@@ -21,8 +21,8 @@ import traceback
 
 # Import all routers
 from lf_assist.app.api import router as lf_assist_router, process_lf_chat, clear_conversation
-from doc_assist.api import router as doc_assist_router, process_pdf_question 
-from db_assist.api import router as db_assist_router, process_db_query
+from doc_assist.api import router as doc_assist_router, process_pdf_question, read_upload_bounded, MAX_PDF_BYTES, MAX_UPLOAD_REQUEST_BYTES
+from db_assist.api import router as db_assist_router, process_db_query, chatbot as db_chatbot
 from viz_assist.api import router as viz_assist_router, process_viz_query, VizChatbotService
 
 # --- Lifespan Event Handler ---
@@ -34,6 +34,13 @@ async def lifespan(app: FastAPI):
     logger.info("Initializing Visualization Chatbot Service...")
     viz_service = VizChatbotService.get_instance()
     viz_service.initialize()
+    
+    # Warm DB Assist so the first request doesn't pay connection setup
+    logger.info("Warming up DB Assist...")
+    await asyncio.to_thread(db_chatbot.warmup)
+    
+    # Same for the Gemini connection pool used by every backend
+    await get_gemini_client().warm_async()
     logger.info("All services initialized")
     
     yield
@@ -46,7 +53,9 @@ app = FastAPI(
     title="Unified Chatbot Router",
     description="Unified API for LF Assist, Doc Assist, DB Assist, and Visualization Assist",
     version="3.1",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson serializes response bodies in C
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -58,6 +67,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """
+    Reject multipart uploads whose Content-Length is already over the PDF
+    limit. Runs before FastAPI parses the form, so the body is never buffered.
+    """
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_REQUEST_BYTES:
+            return JSONResponse(status_code=413, content={"detail": "File size exceeds the 5MB limit."})
+    return await call_next(request)
+
 # Include all backend routers
 app.include_router(lf_assist_router)
 app.include_router(doc_assist_router)
@@ -585,7 +606,7 @@ def dump_model(obj):
             "model": ChatResponse
         },
         400: {
-            "description": "Bad request - Invalid file type or file too large",
+            "description": "Bad request - Invalid file type",
             "model": HTTPErrorResponse,
             "content": {
                 "application/json": {
@@ -593,15 +614,20 @@ def dump_model(obj):
                         "invalid_file": {
                             "summary": "Invalid file type",
                             "value": {"detail": "Invalid file type. Please upload a PDF."}
-                        },
-                        "file_too_large": {
-                            "summary": "File too large",
-                            "value": {"detail": "File size exceeds the 5MB limit."}
                         }
                     }
                 }
             }
         },
+        413: {
+            "description": "File too large (over 5MB)",
+            "model": HTTPErrorResponse,
+            "content": {
+                "application/json": {
+                    "example": {"detail": "File size exceeds the 5MB limit."}
+                }
+            }
+        },
         422: {
             "description": "Validation error - Missing or invalid fields",
             "model": ValidationErrorResponse
@@ -666,6 +692,10 @@ async def unified_chat(
     doc_uploaded = file is not None
     logger.info(f"Query: '{message}' | Doc: {doc_uploaded}")
 
+    # Oversized files fail before the classification call is spent on them
+    if doc_uploaded and file.size is not None and file.size > MAX_PDF_BYTES:
+        raise HTTPException(status_code=413, detail="File size exceeds the 5MB limit.")
+
     # Step 1: Classify the query
     category = await classify_query_with_gemini(message, doc_uploaded)
     logger.info(f"Category: {category}")
@@ -718,7 +748,7 @@ async def unified_chat(
         
     elif category == "doc_assist":
         logger.info("Routing to Doc Assist")
-        file_content = await file.read()
+        file_content = await read_upload_bounded(file)
         answer = await process_pdf_question(message, file_content, file.filename)
         backend = "doc_assist"
         
@@ -13,6 +13,8 @@ from services import get_langchain_llm
 
 # Assumed import from your project structure
 from .llm_model_gemini import SQLQueryGenerator
+from viz_assist.tools.extract_query import extract_sql_query
+from viz_assist.db.safe_query_analyzer import _safe_sql
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -254,9 +256,6 @@ class SQLLangGraphAgentGemini:
                     "current_step": "query_validation_failed"
                 }
 
-            from tools.extract_query import extract_sql_query
-            from db.safe_query_analyzer import _safe_sql
-            
             cleaned_query = extract_sql_query(state["raw_sql_query"], strip_comments=True)
             safety_result = _safe_sql(cleaned_query)
             
@@ -1,8 +1,7 @@
 import os
 import logging
 from dotenv import load_dotenv
-from langchain_core.messages import SystemMessage, HumanMessage
-from services import get_sql_generator_llm
+from services import get_sql_generator_llm, build_sql_messages
 
 # Load environment variables
 load_dotenv()
@@ -11,53 +10,42 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Static system prompt, built once at import and shared by every generator.
+# Kept flush-left so the exact same bytes lead every request (Gemini's implicit
+# prompt caching reuses identical prefixes).
+BASE_SYSTEM_PROMPT = """You are an expert SQL query generator for Amazon Redshift, specialized in producing queries for data visualization tools (charts, dashboards, and reports).
+You must strictly follow these rules:
+1. Use only the tables and columns explicitly provided in the schema. Do not infer or assume any additional fields.
+2. If the user requests a column, metric, or dimension not present in the schema, respond exactly with: "Column not available in schema."
+3. Generate only Redshift-compatible SQL syntax.
+4. Never hallucinate table names, column names, or derived fields.
+5. When joining tables, only join using columns that exist in the schema and are logically related.
+6. Optimize queries for visualization use cases:
+    - Include appropriate aggregations (SUM, COUNT, AVG, etc.) when needed.
+    - Use GROUP BY for categorical or time-based dimensions.
+    - Apply clear column aliases suitable for chart labels.
+    - Use ORDER BY to produce meaningful visual ordering.
+    - Apply LIMIT where appropriate for previews or top-N visualizations.
+
+Do not include explanatory text, comments, markdown backticks, or formatting instructions.
+Return ONLY the raw SQL query unless a schema violation occurs."""
+
+
 class SQLQueryGenerator:
     def __init__(self):
         # Use centralized LangChain LLM service
         self.model = get_sql_generator_llm()
         
         # Base system prompt for SQL generation
-        self.base_system_prompt = """You are an expert SQL query generator for Amazon Redshift, specialized in producing queries  for data visualization tools (charts, dashboards, and reports).
-                                    You must strictly follow these rules:
-                                    1. Use only the tables and columns explicitly provided in the schema. Do not infer or assume any additional fields.
-                                    2. If the user requests a column, metric, or dimension not present in the schema, respond exactly with: "Column not available in schema."
-                                    3. Generate only Redshift-compatible SQL syntax.
-                                    4. Never hallucinate table names, column names, or derived fields.
-                                    5. When joining tables, only join using columns that exist in the schema and are logically related.
-                                    6. Optimize queries for visualization use cases:
-                                        - Include appropriate aggregations (SUM, COUNT, AVG, etc.) when needed.
-                                        - Use GROUP BY for categorical or time-based dimensions.
-                                        - Apply clear column aliases suitable for chart labels.
-                                        - Use ORDER BY to produce meaningful visual ordering.
-                                        - Apply LIMIT where appropriate for previews or top-N visualizations.
-
-                                    Do not include explanatory text, comments, markdown backticks, or formatting instructions.
-                                    Return ONLY the raw SQL query unless a schema violation occurs."""
+        self.base_system_prompt = BASE_SYSTEM_PROMPT
 
     def generate_sql_query(self, user_request: str, schema_info: str = "", join_details: str = "", database_type: str = "Redshift") -> str:
         """
         Generate SQL query based on user request and provided schema information.
         """
         try:
-            # Construct the user-specific context
-            user_context = f"""
-                                Database Type: {database_type}
-
-                                Schema Information:
-                                {schema_info}
-
-                                Join Details:
-                                {join_details}
-
-                                User Question: 
-                                {user_request}
-
-                                Generate the appropriate SQL query:"""
             # Create message payload
-            messages = [
-                SystemMessage(content=self.base_system_prompt),
-                HumanMessage(content=user_context)
-            ]
+            messages = build_sql_messages(self.base_system_prompt, user_request, schema_info, join_details, database_type)
 
             # Invoke the model
             response = self.model.invoke(messages)
@@ -8,7 +8,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from fastapi import APIRouter, HTTPException, status
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ConfigDict
 from dotenv import load_dotenv
 
 try:
@@ -50,13 +50,14 @@ class ChatRequest(BaseModel):
         description="Session ID for conversation history"
     )
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "question": "Show me a bar chart of loan amounts by state",
                 "thread_id": "user_123_session_456"
             }
         }
+    )
 
 class ChartConfig(BaseModel):
     """Configuration for rendering a chart"""
@@ -66,8 +67,8 @@ class ChartConfig(BaseModel):
     y_axis: Optional[str] = Field(None, description="Data key for Y-axis")
     reason: Optional[str] = Field(None, description="Why this chart type was recommended")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "type": "bar",
                 "title": "Loan Distribution by State",
@@ -76,6 +77,7 @@ class ChartConfig(BaseModel):
                 "reason": "Bar chart is ideal for comparing categorical data"
             }
         }
+    )
 
 
 class ChartAnalysis(BaseModel):
@@ -85,8 +87,8 @@ class ChartAnalysis(BaseModel):
     auto_chart: Optional[ChartConfig] = Field(None, description="Recommended chart configuration")
     suggested_charts: Optional[List[Dict[str, Any]]] = Field(None, description="Alternative chart options")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "chartable": True,
                 "reasoning": "Data has categorical X values and numeric Y values, suitable for visualization",
@@ -99,6 +101,7 @@ class ChartAnalysis(BaseModel):
                 "suggested_charts": [{"type": "pie", "title": "State Distribution"}]
             }
         }
+    )
 
 class ChatResponse(BaseModel):
     """Response from visualization endpoint containing query results and chart config"""
@@ -108,8 +111,8 @@ class ChatResponse(BaseModel):
     error: Optional[str] = Field(None, description="Error message if query failed")
     record_count: int = Field(default=0, description="Number of data records returned")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "sql_query": "SELECT state, COUNT(*) as loan_count FROM loans GROUP BY state",
                 "data": [
@@ -131,6 +134,7 @@ class ChatResponse(BaseModel):
                 "record_count": 3
             }
         }
+    )
 
 
 class VizHealthResponse(BaseModel):
@@ -140,8 +144,8 @@ class VizHealthResponse(BaseModel):
     agent_ready: bool = Field(..., description="SQL agent initialization status")
     initialized: bool = Field(..., description="Overall service initialization status")
 
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "vector_store": True,
                 "query_runner": True,
@@ -149,6 +153,7 @@ class VizHealthResponse(BaseModel):
                 "initialized": True
             }
         }
+    )
 
 class VizChatbotService:
     """Visualization Chatbot Service - Singleton instance"""